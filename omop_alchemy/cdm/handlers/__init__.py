@@ -1,6 +1,20 @@
-from .vocabs_and_mappers import make_concept_resolver, ConceptResolverRegistry
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .vocabs_and_mappers import make_concept_resolver, ConceptResolverRegistry
+
+
+def __getattr__(name: str):
+    # deferred so importing the handlers package does not configure the ORM
+    if name in ("make_concept_resolver", "ConceptResolverRegistry"):
+        from . import vocabs_and_mappers
+        value = getattr(vocabs_and_mappers, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     "make_concept_resolver",
     "ConceptResolverRegistry",
-]
\ No newline at end of file
+]
@@ -1,16 +1,52 @@
-from .vocab_handlers import LookupIndex, LookupSpec, ConceptResolver, make_concept_resolver
-from .concept_normalisers import compose_normalizers, normalize_default, strip_uicc, make_stage, site_to_NOS
-from .concept_registry import ConceptResolverRegistry
+from typing import TYPE_CHECKING
+
+from .concept_normalisers import (
+    compose_normalizers,
+    specialize_normalizer,
+    replacement_normalizer,
+    normalize_default,
+    strip_uicc,
+    make_stage,
+    site_to_NOS,
+)
+
+if TYPE_CHECKING:
+    from .vocab_handlers import LookupIndex, LookupSpec, ConceptResolver, TrieMapping, make_concept_resolver
+    from .concept_registry import ConceptResolverRegistry
+
+# vocab_handlers pulls in the full ORM model graph, so these are only imported
+# on first access (PEP 562) - the normalisers above stay cheap to import
+_LAZY_EXPORTS = {
+    "LookupIndex": ".vocab_handlers",
+    "LookupSpec": ".vocab_handlers",
+    "ConceptResolver": ".vocab_handlers",
+    "TrieMapping": ".vocab_handlers",
+    "make_concept_resolver": ".vocab_handlers",
+    "ConceptResolverRegistry": ".concept_registry",
+}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
 
 __all__ = [
     "LookupIndex",
     "LookupSpec",
     "ConceptResolver",
+    "TrieMapping",
     "make_concept_resolver",
     "compose_normalizers",
+    "specialize_normalizer",
+    "replacement_normalizer",
     "normalize_default",
     "strip_uicc",
     "make_stage",
     "site_to_NOS",
     "ConceptResolverRegistry",
-]
\ No newline at end of file
+]
@@ -1,14 +1,108 @@
+import functools
+import re
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from .vocab_handlers import Normaliser
 
+def _pipeline_name(kind: str, fns: tuple["Normaliser", ...]) -> str | None:
+    """
+    Name for a pipeline built from ``fns``, or None if any part has no
+    ``__qualname__`` (partials, callable instances) and so no stable name.
+    """
+    parts = []
+    for fn in fns:
+        qualname = getattr(fn, "__qualname__", None)
+        if qualname is None:
+            return None
+        parts.append(f"{getattr(fn, '__module__', None)}.{qualname}")
+    return f"{kind}({', '.join(parts)})"
+
+
 def compose_normalizers(*fns: "Normaliser") -> "Normaliser":
-    def _inner(s: str) -> str:
-        for fn in fns:
-            s = fn(s)
-        return s
-    return _inner
+    name = _pipeline_name("compose_normalizers", fns)
+    if len(fns) == 1:
+        return fns[0]
+    # adjacent replacement tables collapse into one regex pass where that
+    # cannot change the result
+    fns = _merge_replacement_runs(fns)
+
+    # short pipelines are flattened into direct nested calls - normalisers run
+    # on every indexed string and every lookup, so the loop overhead adds up
+    if len(fns) == 1:
+        composed = fns[0]
+    elif len(fns) == 2:
+        f, g = fns
+        composed = lambda s: g(f(s))
+    elif len(fns) == 3:
+        f, g, h = fns
+        composed = lambda s: h(g(f(s)))
+    else:
+        def composed(s: str) -> str:
+            for fn in fns:
+                s = fn(s)
+            return s
+
+    # name the pipeline after its parts so it has a stable identity across
+    # processes (used to key on-disk lookup caches); unnamed parts leave it
+    # unnamed, which keeps such specs out of the disk cache
+    if name is not None:
+        composed.__qualname__ = composed.__name__ = name
+    return composed
+
+
+def replacement_normalizer(table: dict[str, str]) -> "Normaliser":
+    """
+    Build a normaliser that lowercases and then applies ``table`` as literal
+    substring replacements in one regex pass.
+
+    Alternatives are tried in table order, so list longer keys before any
+    key that is a prefix of them. The table is kept on the function as
+    ``replacements`` so that ``compose_normalizers`` can merge adjacent
+    replacement normalisers into a single pass.
+    """
+    pattern = re.compile('|'.join(map(re.escape, table)))
+    repl = lambda m: table[m.group(0)]
+
+    def _replace(s: str) -> str:
+        return pattern.sub(repl, s.lower())
+
+    _replace.replacements = table  # type: ignore[attr-defined]
+    return _replace
+
+
+def _overlaps(a: str, b: str) -> bool:
+    # True if b could match across or within an occurrence of a
+    if not a or a in b or b in a:
+        return True
+    return any(a.endswith(b[:i]) or a.startswith(b[-i:]) for i in range(1, len(b)))
+
+
+def _merges_safely(first: dict[str, str], second: dict[str, str]) -> bool:
+    """
+    True if applying ``first`` then ``second`` equals applying both at once:
+    no key of ``second`` can match within, across or next to text that
+    ``first`` matched or produced.
+    """
+    if any(v.lower() != v for v in first.values()):
+        return False
+    return not any(
+        _overlaps(text, key)
+        for key in second
+        for text in (*first, *first.values())
+    )
+
+
+def _merge_replacement_runs(fns: tuple["Normaliser", ...]) -> tuple["Normaliser", ...]:
+    merged: list["Normaliser"] = []
+    for fn in fns:
+        table = getattr(fn, "replacements", None)
+        prev = getattr(merged[-1], "replacements", None) if merged else None
+        if table is not None and prev is not None and _merges_safely(prev, table):
+            merged[-1] = replacement_normalizer({**prev, **table})
+        else:
+            merged.append(fn)
+    return tuple(merged)
 
 """
 This module contains core normalisation functions for concept lookups.
@@ -24,18 +118,91 @@ def normalize_default(s: str) -> str:
 def strip_uicc(code: str) -> str:
     return code.lower().replace('ajcc', 'ajcc/uicc')
 
+strip_uicc.replacements = {'ajcc': 'ajcc/uicc'}  # type: ignore[attr-defined]
+
+# longest numerals first so '-iii' is not consumed as '-i' + 'ii'
+_STAGE_MAP = {'-iii': '-3', '-iv': '-4', '-ii': '-2', '-i': '-1', 'nos': ''}
+_STAGE_RE = re.compile('|'.join(map(re.escape, _STAGE_MAP)))
+
+def _stage_repl(m: re.Match[str]) -> str:
+    return _STAGE_MAP[m.group(0)]
+
 def make_stage(val: str) -> str:
-    val = val.lower()
-    roman_lookup = [('-iii', '-3'), ('-iv', '-4'), ('-ii', '-2'), ('-i', '-1'), ('nos', '')]
-    for replacement in roman_lookup:
-        val = val.replace(*replacement)
-    return val
+    return _STAGE_RE.sub(_stage_repl, val.lower())
+
+make_stage.replacements = _STAGE_MAP  # type: ignore[attr-defined]
 
 def site_to_NOS(icdo_topog: str) -> str:
-    split_topog = icdo_topog.split('.')
-    if '.' not in icdo_topog:
-        return f'{icdo_topog}.9'
+    i = icdo_topog.rfind('.')
+    if i < 0:
+        return icdo_topog + '.9'
     # a couple of codes have a third decimal point?
-    elif len(split_topog[-1]) > 2:
-        return ''.join(split_topog[:-1] + ['.', split_topog[-1][:2]])
+    if len(icdo_topog) - i > 3:
+        head = icdo_topog[:i]
+        if '.' in head:
+            # earlier dots are dropped, keeping only the last one
+            head = head.replace('.', '')
+        return head + icdo_topog[i:i + 3]
     return icdo_topog
+
+
+# site_to_NOS as inline statements on ``s``, for specialize_normalizer
+_SITE_TO_NOS_SRC = """\
+i = s.rfind('.')
+if i < 0:
+    s = s + '.9'
+elif len(s) - i > 3:
+    head = s[:i]
+    if '.' in head:
+        head = head.replace('.', '')
+    s = head + s[i:i + 3]"""
+
+
+@functools.lru_cache(maxsize=None)
+def specialize_normalizer(*fns: "Normaliser") -> "Normaliser":
+    """
+    Generate a single function equivalent to ``compose_normalizers(*fns)``
+    with the known steps inlined.
+
+    ``normalize_default``, ``site_to_NOS`` and any replacement normaliser
+    (``strip_uicc``, ``make_stage``, ``replacement_normalizer`` tables) are
+    emitted as straight-line statements, with repeated lowercasing dropped;
+    any other callable is called in place. Results are cached per pipeline,
+    so specs sharing a pipeline share the generated function.
+    """
+    if not fns:
+        raise ValueError("specialize_normalizer needs at least one normaliser")
+    name = _pipeline_name("specialize_normalizer", fns)
+    # generated functions report this module, so named pipelines get a
+    # stable _callable_key like compose_normalizers ones
+    namespace: dict[str, object] = {"__name__": __name__}
+    body: list[str] = []
+    lowered = False
+    for n, fn in enumerate(_merge_replacement_runs(fns)):
+        table = getattr(fn, "replacements", None)
+        if fn is normalize_default:
+            body.append("s = s.strip()" if lowered else "s = s.strip().lower()")
+            lowered = True
+        elif table is not None:
+            namespace[f"_p{n}"] = re.compile('|'.join(map(re.escape, table)))
+            namespace[f"_r{n}"] = lambda m, table=table: table[m.group(0)]
+            subject = "s" if lowered else "s.lower()"
+            body.append(f"s = _p{n}.sub(_r{n}, {subject})")
+            # replacement tables only merge when their values are lowercase
+            lowered = all(v.lower() == v for v in table.values())
+        elif fn is site_to_NOS:
+            # only drops dots or appends '.9', so case is preserved
+            body.extend(_SITE_TO_NOS_SRC.splitlines())
+        else:
+            namespace[f"_f{n}"] = fn
+            body.append(f"s = _f{n}(s)")
+            lowered = False
+
+    src = "def _specialized(s):\n" + "".join(f"    {line}\n" for line in body) + "    return s\n"
+    exec(compile(src, f"<{name or 'specialize_normalizer'}>", "exec"), namespace)
+    specialized = namespace["_specialized"]
+    # without a name for every part, stay recognisably anonymous (as a closure
+    # would) so the pipeline is kept out of the disk cache
+    specialized.__qualname__ = name or "specialize_normalizer.<locals>._specialized"  # type: ignore[attr-defined]
+    specialized.__name__ = name or "_specialized"  # type: ignore[attr-defined]
+    return specialized  # type: ignore[return-value]
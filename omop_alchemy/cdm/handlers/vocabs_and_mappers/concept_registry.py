@@ -1,9 +1,110 @@
 from collections.abc import Mapping
-from typing import Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import fields
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Iterable, TYPE_CHECKING
+import hashlib
+import importlib.metadata
+import os
+import pickle
+import tempfile
+import threading
 import sqlalchemy as sa
 import sqlalchemy.orm as so
 
-from .vocab_handlers import ConceptResolver
+if TYPE_CHECKING:
+    # type-only: importing vocab_handlers pulls in the whole OMOP model graph
+    from .vocab_handlers import ConceptResolver, LookupIndex, LookupSpec
+
+# bump when the on-disk layout of cached lookup indexes changes
+INDEX_CACHE_VERSION = 1
+
+
+def _package_version() -> str:
+    # part of the disk cache key: normaliser bodies can change between
+    # releases without their names changing
+    try:
+        return importlib.metadata.version("omop-alchemy")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+# Indexes supporting the LookupSpec filter queries. The partial index matches
+# the standard_only path that almost every spec takes; the trigram index lets
+# postgres answer unanchored ILIKE on concept_code without a seq scan.
+_LOOKUP_INDEXES: dict[str, tuple[str, ...]] = {
+    "postgresql": (
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS ix_concept_domain_std ON concept (domain_id, standard_concept) "
+        "WHERE standard_concept = 'S'",
+        "CREATE INDEX IF NOT EXISTS ix_concept_code_trgm ON concept USING gin (concept_code gin_trgm_ops)",
+    ),
+    "sqlite": (
+        "CREATE INDEX IF NOT EXISTS ix_concept_domain_std ON concept (domain_id, standard_concept)",
+        "CREATE INDEX IF NOT EXISTS ix_concept_code ON concept (concept_code)",
+    ),
+}
+
+
+def _callable_key(fn: Callable[..., Any]) -> str | None:
+    """
+    Stable, process-independent name for a normaliser, or None if it has none
+    (lambdas and closures cannot be told apart by name).
+    """
+    module = getattr(fn, "__module__", None)
+    qualname = getattr(fn, "__qualname__", None)
+    # partials and callable instances have no qualname of their own
+    if module is None or qualname is None or "<" in qualname:
+        return None
+    return f"{module}.{qualname}"
+
+
+def _spec_key(spec: "LookupSpec") -> str | None:
+    parts = []
+    for f in fields(spec):
+        value = getattr(spec, f.name)
+        if callable(value):
+            value = _callable_key(value)
+            if value is None:
+                return None
+        parts.append(f"{f.name}={value!r}")
+    return ";".join(parts)
+
+
+class _SpecBuilder:
+    """
+    Resolver builder backed by a LookupSpec.
+
+    Unlike an arbitrary builder callable, the spec is inspectable, which is
+    what allows the registry to persist and reload the built index.
+    """
+
+    def __init__(
+        self,
+        spec: "LookupSpec",
+        *,
+        runtime_normalizer: Callable[[str], str] | None = None,
+        corrections: Iterable[Callable[[str], str]] | None = None,
+    ):
+        self.spec = spec
+        self.runtime_normalizer = runtime_normalizer
+        self.corrections = tuple(corrections or ())
+
+    def build_index(self, session: so.Session) -> "LookupIndex":
+        from .vocab_handlers import OMOPConceptSource
+        return OMOPConceptSource.build_lookup(session, self.spec)
+
+    def resolver(self, index: "LookupIndex") -> "ConceptResolver":
+        from .vocab_handlers import ConceptResolver
+        return ConceptResolver(
+            index,
+            normalizer=self.runtime_normalizer or self.spec.normalizer,
+            corrections=self.corrections,
+        )
+
+    def __call__(self, session: so.Session) -> "ConceptResolver":
+        return self.resolver(self.build_index(session))
+
 
 class ConceptResolverRegistry:
     """
@@ -12,15 +113,26 @@ class ConceptResolverRegistry:
     Resolvers are constructed on first access and cached for the lifetime
     of this registry instance. The registry is scoped to a SQLAlchemy Engine,
     ensuring vocab lookups are built once per database.
+
+    If ``cache_dir`` is given, lookup indexes for spec-backed resolvers (see
+    ``register_spec``) are also persisted there and reused by later
+    processes. Entries are keyed on the engine URL, the spec and the package version, and are
+    invalidated when the concept table fingerprint (max concept_id, row
+    count) changes. Cache files are pickles, so ``cache_dir`` must not be
+    writable by untrusted users.
     """
 
-    def __init__(self, engine: sa.Engine):
+    def __init__(self, engine: sa.Engine, cache_dir: Path | str | None = None):
         self.engine = engine
-        self._cache: dict[str, ConceptResolver] = {}
-        self._builders: dict[str, Callable[[so.Session], ConceptResolver]] = {}
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._cache: dict[str, "ConceptResolver"] = {}
+        self._builders: dict[str, Callable[[so.Session], "ConceptResolver"]] = {}
+        self._lock = threading.Lock()
+        self._build_locks: dict[str, threading.Lock] = {}
+        self._fingerprint: tuple[Any, ...] | None = None
 
     
-    def register(self, name: str, builder: Callable[[so.Session], ConceptResolver]) -> None:
+    def register(self, name: str, builder: Callable[[so.Session], "ConceptResolver"]) -> None:
         """
         Register a named resolver builder.
 
@@ -32,11 +144,31 @@ class ConceptResolverRegistry:
 
         self._builders[name] = builder
 
-    def get(self, name: str) -> ConceptResolver:
+    def register_spec(
+        self,
+        spec: "LookupSpec",
+        *,
+        runtime_normalizer: Callable[[str], str] | None = None,
+        corrections: Iterable[Callable[[str], str]] | None = None,
+    ) -> None:
+        """
+        Register a resolver built from ``spec`` under ``spec.name``.
+
+        The runtime normaliser defaults to ``spec.normalizer``. Spec-backed
+        resolvers are eligible for the on-disk index cache.
+        """
+        self.register(
+            spec.name,
+            _SpecBuilder(spec, runtime_normalizer=runtime_normalizer, corrections=corrections),
+        )
+
+    def get(self, name: str) -> "ConceptResolver":
         """
         Return a cached resolver by name, building it lazily if required.
 
-        The resolver must have been registered via ``register``.
+        The resolver must have been registered via ``register``. Safe to call
+        from multiple threads: concurrent first requests for the same name
+        wait on a per-name lock so the builder only runs once.
         """
         if name in self._cache:
             return self._cache[name]
@@ -47,15 +179,210 @@ class ConceptResolverRegistry:
                 f"Available resolvers: {sorted(self._builders)}"
             )
 
-        builder = self._builders[name]
+        with self._lock:
+            build_lock = self._build_locks.setdefault(name, threading.Lock())
+
+        with build_lock:
+            # another thread may have finished the build while we waited
+            if name in self._cache:
+                return self._cache[name]
+
+            builder = self._builders[name]
+            resolver = None
+            if isinstance(builder, _SpecBuilder):
+                index = self._load_index(builder.spec)
+                if index is not None:
+                    resolver = builder.resolver(index)
+
+            if resolver is None:
+                with so.Session(self.engine) as session:
+                    resolver = builder(session)
+                if isinstance(builder, _SpecBuilder):
+                    self._store_index(builder.spec, resolver.index)
+
+            with self._lock:
+                return self._cache.setdefault(name, resolver)
+
+    def _concept_fingerprint(self) -> tuple[Any, ...]:
+        # computed once per registry: vocabularies do not change under a
+        # running process, and count(*) on concept is not free
+        if self._fingerprint is None:
+            from ...model.vocabulary import Concept
+            with so.Session(self.engine) as session:
+                row = session.execute(
+                    sa.select(sa.func.max(Concept.concept_id), sa.func.count()).select_from(Concept)
+                ).one()
+            self._fingerprint = tuple(row)
+        return self._fingerprint
+
+    def _index_path(self, spec: "LookupSpec") -> Path | None:
+        if self.cache_dir is None:
+            return None
+        key = _spec_key(spec)
+        if key is None:
+            return None
+        url = self.engine.url.render_as_string(hide_password=True)
+        digest = hashlib.sha256(
+            f"{INDEX_CACHE_VERSION}|{_package_version()}|{url}|{key}".encode()
+        ).hexdigest()
+        return self.cache_dir / f"{digest}.pkl"
+
+    def _load_index(self, spec: "LookupSpec") -> "LookupIndex | None":
+        path = self._index_path(spec)
+        if path is None or not path.exists():
+            return None
+        try:
+            with path.open("rb") as f:
+                version, fingerprint, name, unknown, mapping = pickle.load(f)
+        except (
+            OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError,
+            # a stale file may name classes that have since moved or gone
+            AttributeError, ImportError,
+        ):
+            return None
+        if version != INDEX_CACHE_VERSION or fingerprint != self._concept_fingerprint():
+            return None
+        if isinstance(mapping, dict):
+            # same read-only view build_lookup hands out
+            mapping = MappingProxyType(mapping)
+        from .vocab_handlers import LookupIndex
+        return LookupIndex(name=name, unknown=unknown, mapping=mapping)
+
+    def _store_index(self, spec: "LookupSpec", index: "LookupIndex") -> None:
+        path = self._index_path(spec)
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = (
+            INDEX_CACHE_VERSION,
+            self._concept_fingerprint(),
+            index.name,
+            index.unknown,
+            # built mappings are read-only views, which do not pickle
+            dict(index.mapping) if isinstance(index.mapping, MappingProxyType) else index.mapping,
+        )
+        # write-then-rename so concurrent readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def ensure_indexes(self) -> None:
+        """
+        Create (if missing) the concept table indexes used by lookup builds.
+
+        On PostgreSQL this includes a ``gin_trgm_ops`` index on concept_code,
+        which requires the ``pg_trgm`` extension (created here if absent, so
+        the connecting role needs permission to do so). SQLite gets plain
+        btree indexes. Statements are idempotent; other dialects raise
+        NotImplementedError, since the DDL is not portable to them.
+        """
+        dialect = self.engine.dialect.name
+        if dialect not in _LOOKUP_INDEXES:
+            raise NotImplementedError(
+                f"ensure_indexes supports {sorted(_LOOKUP_INDEXES)}, not {dialect!r}; "
+                "create the concept indexes manually for this database"
+            )
+        statements = _LOOKUP_INDEXES[dialect]
+        with self.engine.begin() as conn:
+            for stmt in statements:
+                conn.execute(sa.text(stmt))
+
+    def prebuild(
+        self,
+        names: Iterable[str] | None = None,
+        max_workers: int = 4,
+        *,
+        ensure_indexes: bool = False,
+    ) -> None:
+        """
+        Build any not-yet-cached resolvers concurrently.
+
+        Each builder runs in a worker thread with its own Session, so the
+        vocabulary queries overlap rather than running back to back. Threads
+        are sufficient here as the work is dominated by waiting on the database.
+
+        Parameters
+        ----------
+        names:
+            Resolver names to build. Defaults to every registered resolver.
+        max_workers:
+            Upper bound on concurrent builds (and so on concurrent DB connections).
+        ensure_indexes:
+            If True, call ``ensure_indexes`` before building. Off by default as
+            it issues DDL, which read-only users of a shared CDM cannot do.
+        """
+        names = list(self._builders) if names is None else list(names)
+        unregistered = [n for n in names if n not in self._builders]
+        if unregistered:
+            raise KeyError(
+                f"No resolver(s) named {unregistered} are registered. "
+                f"Available resolvers: {sorted(self._builders)}"
+            )
+
+        missing = [n for n in dict.fromkeys(names) if n not in self._cache]
+        if not missing:
+            return
+
+        if ensure_indexes:
+            self.ensure_indexes()
+
+        # get() holds the per-name build lock, so this cannot race a
+        # concurrent get() into building the same resolver twice
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for future in as_completed([pool.submit(self.get, name) for name in missing]):
+                future.result()
+
+    def prebuild_fused(self, specs: Iterable["LookupSpec"]) -> None:
+        """
+        Build resolvers for several LookupSpecs, sharing one concept query.
+
+        Flat specs (no ``parents``, no ``include_synonyms``) are fused into a
+        single ``UNION ALL`` over the concept table via
+        ``OMOPConceptSource.build_lookups_fused``; others are built one at a
+        time. Each spec is registered under ``spec.name`` (if not already) and
+        the resulting resolver uses ``spec.normalizer`` at runtime with no
+        corrections. Names that already have a registered builder are built
+        with that builder instead, so explicit registrations always win.
+        """
+        from .vocab_handlers import OMOPConceptSource
+
+        pending = [spec for spec in specs if spec.name not in self._cache]
+        custom = [spec.name for spec in pending if spec.name in self._builders]
+        builders = {
+            spec.name: _SpecBuilder(spec)
+            for spec in pending
+            if spec.name not in self._builders
+        }
+        for name, builder in builders.items():
+            self.register(name, builder)
+
+        # anything already in the on-disk cache is reused rather than rebuilt
+        indexes: dict[str, "LookupIndex"] = {}
+        for name, builder in builders.items():
+            index = self._load_index(builder.spec)
+            if index is not None:
+                indexes[name] = index
+        to_build = [b.spec for name, b in builders.items() if name not in indexes]
+        if to_build:
+            with so.Session(self.engine) as session:
+                built = OMOPConceptSource.build_lookups_fused(session, to_build)
+            for spec in to_build:
+                self._store_index(spec, built[spec.name])
+            indexes.update(built)
 
-        with so.Session(self.engine) as session:
-            resolver = builder(session)
+        with self._lock:
+            for name, builder in builders.items():
+                self._cache.setdefault(name, builder.resolver(indexes[name]))
 
-        self._cache[name] = resolver
-        return resolver
+        for name in custom:
+            self.get(name)
 
-    def __getitem__(self, name: str) -> ConceptResolver:
+    def __getitem__(self, name: str) -> "ConceptResolver":
         return self.get(name)
 
     def __contains__(self, name: str) -> bool:
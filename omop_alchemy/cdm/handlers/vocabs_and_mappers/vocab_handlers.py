@@ -1,5 +1,10 @@
-from typing import Iterable, Callable
-from dataclasses import dataclass
+from typing import Any, Iterable, Callable, Iterator, Literal, TypedDict, Unpack, get_args
+from collections.abc import Mapping
+import functools
+import sys
+import weakref
+from types import MappingProxyType
+from dataclasses import dataclass, field
 import sqlalchemy as sa
 import sqlalchemy.orm as so
 
@@ -16,8 +21,167 @@ it's not worth over-engineering separation at this stage.
 """
 
 Normaliser = Callable[[str], str]
+CodeFilterMode = Literal["ilike", "trgm", "fts"]
 
-@dataclass(frozen=True)
+
+class _ConceptFilters(TypedDict, total=False):
+    # keyword arguments shared by iter_concepts / iter_name_code / _concept_query
+    domain_id: str | None
+    concept_class_id: Iterable[str] | None
+    vocabulary_id: Iterable[str] | None
+    standard_only: bool
+    code_filter: str | None
+    code_filter_mode: CodeFilterMode
+    parents: Iterable[int] | None
+    include_non_standard_descendants: bool
+
+
+# built LookupIndexes per engine and spec - vocabulary tables are effectively
+# static for the life of a process, and specs are often rebuilt (per test,
+# per pipeline run) against the same database
+_LOOKUP_CACHE: "weakref.WeakKeyDictionary[sa.Engine, dict[LookupSpec, LookupIndex]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+# Lookup keys are interned so indexes built over overlapping vocabularies
+# share one string per key - but only where interned strings can be freed.
+# On CPython 3.12 they are immortal, which would pin every key of every index
+# for the life of the process, however often indexes are rebuilt or dropped.
+if sys.version_info >= (3, 13):
+    _intern_key = sys.intern
+else:
+    def _intern_key(key: str) -> str:
+        return key
+
+def _may_see_uncommitted(session: so.Session) -> bool:
+    """
+    True if a read through ``session`` may include uncommitted writes, so
+    what it builds must not reach the shared _LOOKUP_CACHE.
+
+    Only a read that begins its own transaction on a clean session is known
+    to see committed data alone. A session already in a transaction may have
+    flushed, or written through ``session.connection()``, and a session bound
+    to a Connection that is inside a transaction (e.g. a test's outer
+    transaction under ``join_transaction_mode="create_savepoint"``) sees
+    that transaction's writes. Checked from the session's own state, so no
+    event listeners are installed on the application's sessions.
+    """
+    if session.new or session.dirty or session.deleted or session.in_transaction():
+        return True
+    bind = session.get_bind()
+    return isinstance(bind, sa.Connection) and bind.in_transaction()
+
+# Core table columns - statements built only from these take SQLAlchemy's
+# plain Core execution path instead of ORM-enabled select compilation
+_C = Concept.__table__.c
+_CS = Concept_Synonym.__table__.c
+_CA = Concept_Ancestor.__table__.c
+
+# selected in ConceptRow field order so rows can be unpacked positionally
+CONCEPT_ROW_COLUMNS = (
+    _C.concept_id,
+    _C.concept_name,
+    _C.concept_code,
+    _C.domain_id,
+    _C.concept_class_id,
+    _C.vocabulary_id,
+    _C.standard_concept,
+)
+
+# all a lookup build needs from each concept
+NAME_CODE_COLUMNS = (_C.concept_id, _C.concept_name, _C.concept_code)
+
+# above this many ids, filter via a join against a literal VALUES list rather
+# than an IN list (SQLite caps bound parameters and large IN lists plan
+# poorly on PG)
+ID_FILTER_VALUES_THRESHOLD = 1000
+
+# above this many parent concepts, hierarchy expansion semi-joins against a
+# VALUES list instead of a giant IN list
+PARENTS_JOIN_THRESHOLD = 100
+
+
+def _id_values(ids: Iterable[int], name: str) -> sa.CTE:
+    """
+    Joinable single-column (``id``) CTE holding ``ids`` as a VALUES list.
+
+    The ids are rendered as literals, so it binds no parameters however long
+    it is, and unlike a temp table it needs no DDL (or DDL rights).
+    """
+    return (
+        sa.values(sa.column("id", sa.Integer), name=name, literal_binds=True)
+        .data([(int(i),) for i in ids])
+        .cte()
+    )
+
+
+def _engine_of(bind: sa.Engine | sa.Connection) -> sa.Engine:
+    # sessions bound to a connection (e.g. inside a test transaction) share
+    # the memoised lookups of the underlying engine
+    return bind.engine if isinstance(bind, sa.Connection) else bind
+
+
+def _given(value: Any) -> bool:
+    # a bind parameter or id selectable stands in for a value list that is
+    # supplied at execution time
+    return isinstance(value, (sa.BindParameter, sa.FromClause)) or bool(value)
+
+
+def _as_sequence(value: Iterable[Any]) -> list[Any] | tuple[Any, ...]:
+    # lists and tuples (LookupSpec stores tuples) are bound as-is; only
+    # one-shot iterables need materialising
+    return value if isinstance(value, (list, tuple)) else list(value)
+
+
+def _in_values(value: Any) -> Any:
+    if isinstance(value, sa.FromClause):
+        return sa.select(value.c.id)
+    return value if isinstance(value, sa.BindParameter) else _as_sequence(value)
+
+class TrieMapping(Mapping[str, int]):
+    """
+    Read-only ``str -> int`` mapping backed by a ``marisa_trie.RecordTrie``.
+
+    Prefix-compressed and held in C, so it is several times smaller than a
+    dict for large vocabularies (ICD10, SNOMED). Requires the optional
+    ``marisa-trie`` dependency (``pip install omop-alchemy[compact]``).
+    """
+
+    __slots__ = ("_trie",)
+
+    def __init__(self, pairs: Mapping[str, int] | Iterable[tuple[str, int]]):
+        try:
+            # optional, and ships no type stubs
+            import marisa_trie  # type: ignore[import-not-found, import-untyped]
+        except ImportError as e:
+            raise ImportError(
+                "Compact lookup indexes require marisa-trie: "
+                "pip install omop-alchemy[compact]"
+            ) from e
+        # collapse duplicate keys first so the last value wins, as in a dict -
+        # a RecordTrie would keep every record and return the first
+        items = dict(pairs).items()
+        # signed 64-bit so local (negative / >2^31) concept ids still fit
+        self._trie = marisa_trie.RecordTrie("<q", ((k, (v,)) for k, v in items))
+
+    def __getitem__(self, key: str) -> int:
+        return self._trie[key][0][0]
+
+    def get(self, key: str, default: Any = None) -> Any:  # type: ignore[override]
+        hit = self._trie.get(key)
+        return hit[0][0] if hit else default
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._trie
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._trie.keys())
+
+    def __len__(self) -> int:
+        return len(self._trie)
+
+
+@dataclass(frozen=True, slots=True)
 class LookupIndex:
     """
     Materialised lookup table from normalised text keys to OMOP concept IDs.
@@ -35,8 +199,9 @@ class LookupIndex:
         Concept ID to return when a lookup fails, or None if failures should
         propagate as null.
     mapping:
-        Dictionary mapping normalised string keys to OMOP concept IDs.
-        Keys are expected to already be normalised at build time.
+        Mapping from normalised string keys to OMOP concept IDs - a dict, or a
+        TrieMapping for indexes built with ``build_compact``. Keys are
+        expected to already be normalised at build time.
 
     Notes
     -----
@@ -45,19 +210,48 @@ class LookupIndex:
     """
     name: str
     unknown: int | None
-    mapping: dict[str, int]
+    mapping: Mapping[str, int]
+    _ids: frozenset[int] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # the mapping is fixed once built, so the concept id set is too
+        object.__setattr__(self, "_ids", frozenset(self.mapping.values()))
+
+    @classmethod
+    def build_compact(
+        cls,
+        name: str,
+        unknown: int | None,
+        pairs: Iterable[tuple[str, int]] | Mapping[str, int],
+    ) -> "LookupIndex":
+        """
+        Build an index whose mapping is a memory-compact TrieMapping.
+
+        Behaves identically to a dict-backed index for lookups; intended for
+        large, long-lived indexes. ``pairs`` may be a mapping or an iterable
+        of (key, concept_id) tuples.
+        """
+        if isinstance(pairs, Mapping):
+            pairs = pairs.items()
+        return cls(name=name, unknown=unknown, mapping=TrieMapping(pairs))
 
     def lookup(self, term: str | None) -> int | None:
         if term is None:
             term = ""
         return self.mapping.get(term, self.unknown)
 
+    def has_key(self, key: str) -> bool:
+        """True if ``key`` (already normalised) is an indexed term."""
+        return key in self.mapping
+
+    def has_concept(self, concept_id: int) -> bool:
+        """True if any indexed term maps to ``concept_id``."""
+        return concept_id in self._ids
+
     def __contains__(self, item: str | int) -> bool:
-        if isinstance(item, str):
-            return item in self.mapping
-        if isinstance(item, int):
-            return item in self.mapping.values()
-        return False
+        # isinstance, not an exact type check: str subclasses such as
+        # numpy.str_ (common in pandas ETL) are keys too
+        return item in self.mapping if isinstance(item, str) else item in self._ids
     
     def __repr__(self) -> str:
         return (
@@ -68,11 +262,19 @@ class LookupIndex:
         )
 
     @property
-    def all_concepts(self) -> set[int]:
-        return set(self.mapping.values())
+    def all_concepts(self) -> frozenset[int]:
+        return self._ids
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # read-only views of built mappings cannot be pickled; the copy
+        # unpickles as the index's own dict
+        mapping = self.mapping
+        if isinstance(mapping, MappingProxyType):
+            mapping = dict(mapping)
+        return (type(self), (self.name, self.unknown, mapping))
     
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class LookupSpec:
     """
     Declarative specification for constructing a vocabulary lookup index.
@@ -105,6 +307,12 @@ class LookupSpec:
     code_filter:
         Optional substring filter applied to concept_code (ILIKE-based).
         Useful for coarse scoping (e.g. AJCC-only codes).
+    code_filter_mode:
+        How ``code_filter`` is matched on PostgreSQL: ``"ilike"`` (substring,
+        default), ``"trgm"`` (pg_trgm similarity operator ``%``, index-backed
+        by the GIN index from ``ConceptResolverRegistry.ensure_indexes``) or
+        ``"fts"`` (full-text match on the code tokens). Note that the latter
+        two are not substring matches. Other dialects always use ILIKE.
     parents:
         Optional list of ancestor concept IDs from which to expand the lookup
         via the Concept_Ancestor table.
@@ -130,20 +338,31 @@ class LookupSpec:
     - Normalisation and correction policies are intentionally split between
       build-time (this spec) and runtime (ConceptResolver) to make lookup
       behaviour explicit and testable.
+    - List arguments are stored as tuples, so specs are hashable; built
+      indexes are cached per (engine, spec) by ``OMOPConceptSource.build_lookup``.
     """
     name: str
     unknown: int | None = 0
     domain_id: str | None = None
-    concept_class_id: list[str] | None = None
-    vocabulary_id: list[str] | None = None
+    concept_class_id: Iterable[str] | None = None
+    vocabulary_id: Iterable[str] | None = None
     standard_only: bool = True
     code_filter: str | None = None
-    parents: list[int] | None = None
+    code_filter_mode: CodeFilterMode = "ilike"
+    parents: Iterable[int] | None = None
     include_non_standard_descendants: bool = False
     include_synonyms: bool = False
     normalizer: Normaliser = normalize_default
     include: tuple[str, ...] = ("concept_name", "concept_code")  # index fields
 
+    def __post_init__(self) -> None:
+        # sequences are stored as tuples so specs are hashable and can key
+        # the build cache
+        for name in ("concept_class_id", "vocabulary_id", "parents", "include"):
+            value = getattr(self, name)
+            if value is not None and not isinstance(value, tuple):
+                object.__setattr__(self, name, tuple(value))
+
 
 class OMOPConceptSource:
     """
@@ -159,25 +378,62 @@ class OMOPConceptSource:
     """
 
     @staticmethod
-    def fetch_synonyms(session: so.Session) -> list[tuple[int, str]]:
+    def fetch_synonyms(
+        session: so.Session,
+        concept_ids: Iterable[int] | None = None,
+    ) -> list[tuple[int, str]]:
         """
-        Return (concept_id, synonym) pairs for all concept synonyms.
+        Return (concept_id, synonym) pairs for concept synonyms.
+
+        If ``concept_ids`` is provided, only synonyms for those concepts are
+        returned and the filter is applied in SQL (an IN list for small id
+        sets, a join against a literal VALUES list for large ones). Otherwise
+        all synonyms are returned.
 
         Filtering (standard / domain / etc.) is intentionally left
         to higher layers.
         """
-        rows = session.execute(
-            sa.select(
-                Concept_Synonym.concept_id,
-                Concept_Synonym.concept_synonym_name,
+        return list(OMOPConceptSource.iter_synonyms(session, concept_ids))
+
+    @staticmethod
+    def iter_synonyms(
+        session: so.Session,
+        concept_ids: Iterable[int] | None = None,
+    ) -> Iterator[tuple[int, str]]:
+        """
+        Streaming form of ``fetch_synonyms``; rows are fetched in batches.
+        """
+        stmt = sa.select(
+            _CS.concept_id,
+            _CS.concept_synonym_name,
+        ).execution_options(yield_per=10_000)
+
+        if concept_ids is None:
+            yield from OMOPConceptSource._non_empty_synonyms(session.execute(stmt))
+            return
+
+        ids = set(concept_ids)
+        if not ids:
+            return
+        if len(ids) <= ID_FILTER_VALUES_THRESHOLD:
+            yield from OMOPConceptSource._non_empty_synonyms(
+                session.execute(
+                    stmt.where(
+                        _CS.concept_id.in_(sa.bindparam("ids", expanding=True))
+                    ),
+                    {"ids": list(ids)},
+                )
+            )
+        else:
+            id_values = _id_values(ids, "concept_ids")
+            yield from OMOPConceptSource._non_empty_synonyms(
+                session.execute(stmt.join(id_values, id_values.c.id == _CS.concept_id))
             )
-        ).all()
 
-        return [
-            (int(r.concept_id), r.concept_synonym_name)
-            for r in rows
-            if r.concept_synonym_name
-        ]
+    @staticmethod
+    def _non_empty_synonyms(rows: Iterable[sa.Row]) -> Iterator[tuple[int, str]]:
+        # integer columns already come back as int under Core
+        return ((cid, name) for cid, name in rows if name)
     
     @staticmethod
     def fetch_concepts(
@@ -188,6 +444,7 @@ class OMOPConceptSource:
         vocabulary_id: Iterable[str] | None = None,
         standard_only: bool = True,
         code_filter: str | None = None,
+        code_filter_mode: CodeFilterMode = "ilike",
         parents: Iterable[int] | None = None,
         include_non_standard_descendants: bool = False,
     ) -> list[ConceptRow]:
@@ -199,42 +456,264 @@ class OMOPConceptSource:
         2. Hierarchical expansion from parent concept(s)
 
         """
+        return list(
+            OMOPConceptSource.iter_concepts(
+                session,
+                domain_id=domain_id,
+                concept_class_id=concept_class_id,
+                vocabulary_id=vocabulary_id,
+                standard_only=standard_only,
+                code_filter=code_filter,
+                code_filter_mode=code_filter_mode,
+                parents=parents,
+                include_non_standard_descendants=include_non_standard_descendants,
+            )
+        )
 
-        q = session.query(Concept)
-        if parents:
-            parents = list(parents)
-            q = (
-                q.join(
-                    Concept_Ancestor,
-                    Concept_Ancestor.descendant_concept_id == Concept.concept_id,
-                )
-                .filter(Concept_Ancestor.ancestor_concept_id.in_(parents))
+    @staticmethod
+    def iter_concepts(
+        session: so.Session,
+        *,
+        domain_id: str | None = None,
+        concept_class_id: Iterable[str] | None = None,
+        vocabulary_id: Iterable[str] | None = None,
+        standard_only: bool = True,
+        code_filter: str | None = None,
+        code_filter_mode: CodeFilterMode = "ilike",
+        parents: Iterable[int] | None = None,
+        include_non_standard_descendants: bool = False,
+    ) -> Iterator[ConceptRow]:
+        """
+        Streaming form of ``fetch_concepts``.
+
+        Rows are fetched from the database in batches and yielded one at a
+        time, so the full result set is never held in memory at once.
+        """
+        stmt, params = OMOPConceptSource._concept_query(
+            session,
+            domain_id=domain_id,
+            concept_class_id=concept_class_id,
+            vocabulary_id=vocabulary_id,
+            standard_only=standard_only,
+            code_filter=code_filter,
+            code_filter_mode=code_filter_mode,
+            parents=parents,
+            include_non_standard_descendants=include_non_standard_descendants,
+        )
+        rows = session.execute(stmt, params)
+        # column order of CONCEPT_ROW_COLUMNS matches the ConceptRow fields;
+        # plain tuple unpacking skips Row attribute access per column, and
+        # the constructor is bound locally to skip a global lookup per row
+        row = ConceptRow
+        for cid, name, code, dom, cls, voc, std in rows:
+            yield row(cid, name, code, dom, cls, voc, std)
+
+    @staticmethod
+    def iter_name_code(
+        session: so.Session,
+        **filters: Unpack[_ConceptFilters],
+    ) -> Iterator[tuple[int, str, str]]:
+        """
+        Stream ``(concept_id, concept_name, concept_code)`` for the concepts
+        matching ``filters`` (the ``iter_concepts`` keyword arguments).
+
+        Lookup builds only need these three columns, so this skips both the
+        other four and the per-row ConceptRow allocation.
+        """
+        stmt, params = OMOPConceptSource._concept_query(session, **filters)
+        yield from session.execute(stmt.with_only_columns(*NAME_CODE_COLUMNS), params).tuples()
+
+    @staticmethod
+    def _concept_query(
+        session: so.Session,
+        *,
+        domain_id: str | None = None,
+        concept_class_id: Iterable[str] | None = None,
+        vocabulary_id: Iterable[str] | None = None,
+        standard_only: bool = True,
+        code_filter: str | None = None,
+        code_filter_mode: CodeFilterMode = "ilike",
+        parents: Iterable[int] | None = None,
+        include_non_standard_descendants: bool = False,
+    ) -> tuple[sa.Select, dict[str, Any]]:
+        """
+        Return the statement for these filters and its execution parameters.
+
+        Normally this is the cached statement for the filter shape. Large
+        ``parents`` lists instead get a one-off statement that semi-joins
+        against a literal VALUES list.
+        """
+        if code_filter_mode not in get_args(CodeFilterMode):
+            raise ValueError(f"Unknown code_filter_mode {code_filter_mode!r}")
+        dialect = session.get_bind().dialect.name
+        # non-PG dialects always fall back to ILIKE, so share that shape
+        mode = code_filter_mode if dialect == "postgresql" else "ilike"
+        parents = _as_sequence(parents) if parents else None
+
+        if parents and len(parents) > PARENTS_JOIN_THRESHOLD:
+            stmt = OMOPConceptSource.select_concepts(
+                domain_id=domain_id,
+                concept_class_id=concept_class_id,
+                vocabulary_id=vocabulary_id,
+                standard_only=standard_only,
+                code_filter=code_filter,
+                code_filter_mode=mode,
+                parents=_id_values(parents, "parents"),
+                include_non_standard_descendants=include_non_standard_descendants,
+                dialect=dialect,
             )
-            if standard_only and not include_non_standard_descendants:
-                q = q.filter(Concept.standard_concept == "S")
+            return stmt.execution_options(yield_per=10_000), {}
+
+        stmt = OMOPConceptSource._select_for_shape(
+            bool(domain_id),
+            bool(concept_class_id),
+            bool(vocabulary_id),
+            standard_only,
+            mode if code_filter else None,
+            bool(parents),
+            include_non_standard_descendants,
+            dialect,
+        )
+        params: dict[str, Any] = {}
         if domain_id:
-            q = q.filter(Concept.domain_id == domain_id)
+            params["domain_id"] = domain_id
         if concept_class_id:
-            q = q.filter(Concept.concept_class_id.in_(list(concept_class_id)))
+            params["concept_class_id"] = _as_sequence(concept_class_id)
         if vocabulary_id:
-            q = q.filter(Concept.vocabulary_id.in_(list(vocabulary_id)))
-        if standard_only and not parents:
-            q = q.filter(Concept.standard_concept == "S")
+            params["vocabulary_id"] = _as_sequence(vocabulary_id)
         if code_filter:
-            q = q.filter(Concept.concept_code.ilike(f"%{code_filter}%"))
-        rows = q.all()
-        return [
-            ConceptRow(
-                concept_id=int(r.concept_id),
-                concept_name=r.concept_name,
-                concept_code=r.concept_code,
-                domain_id=r.domain_id,
-                concept_class_id=r.concept_class_id,
-                vocabulary_id=r.vocabulary_id,
-                standard_concept=r.standard_concept,
+            params["code_filter"] = (
+                f"%{code_filter.lower()}%" if mode == "ilike" else code_filter
             )
-            for r in rows
-        ]
+        if parents:
+            params["parents"] = parents
+
+        return stmt, params
+
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _select_for_shape(
+        has_domain: bool,
+        has_class: bool,
+        has_vocab: bool,
+        standard_only: bool,
+        code_filter_mode: CodeFilterMode | None,
+        has_parents: bool,
+        include_non_standard_descendants: bool,
+        dialect: str | None,
+    ) -> sa.Select:
+        """
+        Parameterised ``select_concepts`` statement for one filter shape.
+
+        Specs only differ in which filters are present and their values, so
+        the statement is built once per shape with named bind parameters and
+        reused; values are supplied at execution time. Reusing the same
+        statement also keeps SQLAlchemy's compiled-SQL cache warm.
+        """
+        return OMOPConceptSource.select_concepts(
+            domain_id=sa.bindparam("domain_id") if has_domain else None,
+            concept_class_id=sa.bindparam("concept_class_id", expanding=True) if has_class else None,
+            vocabulary_id=sa.bindparam("vocabulary_id", expanding=True) if has_vocab else None,
+            standard_only=standard_only,
+            code_filter=sa.bindparam("code_filter") if code_filter_mode else None,
+            code_filter_mode=code_filter_mode or "ilike",
+            parents=sa.bindparam("parents", expanding=True) if has_parents else None,
+            include_non_standard_descendants=include_non_standard_descendants,
+            dialect=dialect,
+        ).execution_options(yield_per=10_000)
+
+    @staticmethod
+    def select_concepts(
+        *,
+        domain_id: str | sa.BindParameter[Any] | None = None,
+        concept_class_id: Iterable[str] | sa.BindParameter[Any] | None = None,
+        vocabulary_id: Iterable[str] | sa.BindParameter[Any] | None = None,
+        standard_only: bool = True,
+        code_filter: str | sa.BindParameter[Any] | None = None,
+        code_filter_mode: CodeFilterMode = "ilike",
+        parents: Iterable[int] | sa.BindParameter[Any] | sa.FromClause | None = None,
+        include_non_standard_descendants: bool = False,
+        dialect: str | None = None,
+    ) -> sa.Select:
+        """
+        Build (but do not execute) the ``fetch_concepts`` query.
+
+        Selects the ConceptRow columns in field order, so callers may extend
+        the projection (e.g. with a tag column) and still unpack positionally.
+        ``dialect`` is the target database dialect name, used to choose the
+        ``code_filter`` strategy.
+
+        Any filter value may also be given as a ``sa.bindparam`` (expanding,
+        for the list-valued filters) to be supplied at execution time; a bound
+        ``code_filter`` must then carry the full pattern for ILIKE matching.
+        ``parents`` may also be a selectable with an ``id`` column.
+        """
+        # Core select of just the ConceptRow columns - avoids hydrating a full
+        # ORM Concept (identity map, instrumentation) per row
+        stmt = sa.select(*CONCEPT_ROW_COLUMNS)
+        has_parents = _given(parents)
+        if has_parents:
+            stmt = (
+                stmt.join(
+                    Concept_Ancestor.__table__,
+                    _CA.descendant_concept_id == _C.concept_id,
+                )
+                .where(_CA.ancestor_concept_id.in_(_in_values(parents)))
+                # a concept reachable from several parents is only wanted once
+                .distinct()
+            )
+            if standard_only and not include_non_standard_descendants:
+                stmt = stmt.where(_C.standard_concept == "S")
+        if _given(domain_id):
+            stmt = stmt.where(_C.domain_id == domain_id)
+        if _given(concept_class_id):
+            stmt = stmt.where(_C.concept_class_id.in_(_in_values(concept_class_id)))
+        if _given(vocabulary_id):
+            stmt = stmt.where(_C.vocabulary_id.in_(_in_values(vocabulary_id)))
+        if standard_only and not has_parents:
+            stmt = stmt.where(_C.standard_concept == "S")
+        if code_filter is not None and _given(code_filter):
+            stmt = OMOPConceptSource._apply_code_filter(
+                stmt, code_filter, code_filter_mode, dialect
+            )
+        return stmt
+
+    @staticmethod
+    def _apply_code_filter(
+        stmt: sa.Select,
+        code_filter: str | sa.BindParameter[Any],
+        mode: CodeFilterMode,
+        dialect: str | None,
+    ) -> sa.Select:
+        """
+        Restrict ``stmt`` to concepts whose concept_code matches ``code_filter``.
+
+        On PostgreSQL every mode can be served by the ``gin_trgm_ops`` index
+        from ``ConceptResolverRegistry.ensure_indexes`` (pg_trgm indexes
+        ILIKE as well as ``%`` similarity), so the unanchored substring match
+        no longer implies a sequential scan; ``fts`` uses a tsquery match.
+
+        Elsewhere the filter is a substring match. SQLite's LIKE is already
+        ASCII case-insensitive, so the pattern is lowercased once here
+        rather than emitting ``lower()`` around every row's concept_code.
+        """
+        if mode not in get_args(CodeFilterMode):
+            raise ValueError(f"Unknown code_filter_mode {mode!r}")
+        if dialect == "postgresql":
+            if mode == "trgm":
+                return stmt.where(_C.concept_code.op("%")(code_filter))
+            if mode == "fts":
+                return stmt.where(
+                    sa.func.to_tsvector("simple", _C.concept_code).op("@@")(
+                        sa.func.plainto_tsquery("simple", code_filter)
+                    )
+                )
+        # a bound code_filter already carries the full (lowercased) pattern
+        if not isinstance(code_filter, sa.BindParameter):
+            code_filter = f"%{code_filter.lower()}%"
+        if dialect == "sqlite":
+            return stmt.where(_C.concept_code.like(code_filter))
+        return stmt.where(_C.concept_code.ilike(code_filter))
     
     @staticmethod
     def descendants(
@@ -243,46 +722,285 @@ class OMOPConceptSource:
         *,
         include_non_standard: bool = False,
     ) -> list[int]:
-        rows = OMOPConceptSource.fetch_concepts(
+        """
+        Return the distinct descendant concept IDs of ``parents``.
+
+        Only the ids are projected, so this is much cheaper than going via
+        ``fetch_concepts`` for large hierarchies. As with ``fetch_concepts``,
+        empty ``parents`` applies no hierarchy filter and returns every
+        (standard, unless ``include_non_standard``) concept ID.
+        """
+        if not parents:
+            stmt = sa.select(_C.concept_id)
+            if not include_non_standard:
+                stmt = stmt.where(_C.standard_concept == "S")
+            return list(session.scalars(stmt))
+        return OMOPConceptSource.descendants_many(
             session,
-            parents=parents,
-            include_non_standard_descendants=include_non_standard,
-            standard_only=not include_non_standard,
+            {"": parents},
+            include_non_standard=include_non_standard,
+        )[""]
+
+    @staticmethod
+    def descendants_many(
+        session: so.Session,
+        parent_groups: Mapping[str, Iterable[int]],
+        *,
+        include_non_standard: bool = False,
+    ) -> dict[str, list[int]]:
+        """
+        Return the distinct descendant concept IDs of several parent sets in
+        one query, keyed like ``parent_groups``.
+
+        The groups are inlined as a ``VALUES (group_key, parent_id)`` CTE and
+        joined to Concept_Ancestor, so N parent sets cost one round trip
+        rather than N, and large sets bind no parameters. Results are pivoted
+        back per group in Python; groups without parents map to ``[]``.
+        """
+        result: dict[str, list[int]] = {key: [] for key in parent_groups}
+        pairs = [(key, p) for key, parents in parent_groups.items() for p in parents]
+        if not pairs:
+            return result
+
+        groups = (
+            sa.values(
+                sa.column("group_key", sa.String),
+                sa.column("parent_id", sa.Integer),
+                name="parent_groups",
+                literal_binds=True,
+            )
+            .data(pairs)
+            .cte()
         )
-        return list({r.concept_id for r in rows})
+        stmt = (
+            sa.select(groups.c.group_key, _CA.descendant_concept_id)
+            .distinct()
+            .join(Concept_Ancestor.__table__, _CA.ancestor_concept_id == groups.c.parent_id)
+            .join(Concept.__table__, _C.concept_id == _CA.descendant_concept_id)
+        )
+        if not include_non_standard:
+            stmt = stmt.where(_C.standard_concept == "S")
+        for key, cid in session.execute(stmt):
+            result[key].append(cid)
+        return result
     
 
     @staticmethod
     def build_lookup(
         session: so.Session,
         spec: LookupSpec,
+        *,
+        force: bool = False,
     ) -> LookupIndex:
-        rows = OMOPConceptSource.fetch_concepts(
-            session,
+        """
+        Materialise ``spec`` into a LookupIndex.
+
+        Results are memoised per (engine, spec); pass ``force=True`` to rebuild
+        (and refresh the cached copy), or call ``clear_lookup_cache`` after
+        modifying vocabulary tables. Only a session that is clean and not yet
+        in a transaction reads or fills the cache - any other may see
+        uncommitted rows, which must never be shared - so build from a fresh
+        session (as ConceptResolverRegistry does) to benefit from it. The
+        returned mapping is read-only.
+        """
+        if _may_see_uncommitted(session):
+            return OMOPConceptSource._build_lookup(session, spec)
+        cached = OMOPConceptSource._engine_cache(session)
+        if not force and spec in cached:
+            return cached[spec]
+        index = OMOPConceptSource._build_lookup(session, spec)
+        cached[spec] = index
+        return index
+
+    @staticmethod
+    def _engine_cache(session: so.Session) -> dict[LookupSpec, LookupIndex]:
+        return _LOOKUP_CACHE.setdefault(_engine_of(session.get_bind()), {})
+
+    @staticmethod
+    def clear_lookup_cache(engine: sa.Engine | sa.Connection | None = None) -> None:
+        """
+        Drop memoised LookupIndexes for ``engine``, or for all engines.
+
+        Indexes depend only on database content, so they are shared by every
+        session on an engine and live as long as it does; vocabulary tables
+        are effectively append-only in production. Call this after modifying
+        them, e.g. in tests. A Connection clears its engine's entries.
+        """
+        if engine is None:
+            _LOOKUP_CACHE.clear()
+        else:
+            _LOOKUP_CACHE.pop(_engine_of(engine), None)
+
+    @staticmethod
+    def _build_lookup(session: so.Session, spec: LookupSpec) -> LookupIndex:
+        filters = _ConceptFilters(
             domain_id=spec.domain_id,
             concept_class_id=spec.concept_class_id,
             vocabulary_id=spec.vocabulary_id,
             standard_only=spec.standard_only,
             code_filter=spec.code_filter,
+            code_filter_mode=spec.code_filter_mode,
             parents=spec.parents,
             include_non_standard_descendants=spec.include_non_standard_descendants,
         )
+        if not spec.include_synonyms:
+            rows = OMOPConceptSource.iter_name_code(session, **filters)
+            return LookupIndex(
+                name=spec.name,
+                unknown=spec.unknown,
+                mapping=MappingProxyType(OMOPConceptSource._index_rows(spec, rows)),
+            )
+
+        # With synonyms, the concept filter becomes a CTE and the matched
+        # concepts' (name, code) rows and their synonyms come back as one
+        # (concept_id, text, code, kind) stream - one round trip, and the
+        # database only ships synonyms for concepts in scope.
+        stmt, params = OMOPConceptSource._concept_query(session, **filters)
+        matched = stmt.with_only_columns(*NAME_CODE_COLUMNS).cte("matched")
+        union = sa.union_all(
+            sa.select(
+                matched.c.concept_id,
+                matched.c.concept_name,
+                matched.c.concept_code,
+                sa.literal("concept"),
+            ),
+            sa.select(
+                _CS.concept_id,
+                _CS.concept_synonym_name,
+                sa.null(),
+                sa.literal("syn"),
+            ).join(matched, matched.c.concept_id == _CS.concept_id),
+        )
+
+        synonyms: list[tuple[int, str]] = []
+
+        def concept_rows() -> Iterator[tuple[int, str, str]]:
+            result = session.execute(union.execution_options(yield_per=10_000), params)
+            for cid, text, code, kind in result:
+                if kind == "syn":
+                    if text:
+                        synonyms.append((cid, text))
+                else:
+                    yield cid, text, code
+
+        # concept rows go through _index_rows, so name / code collisions
+        # resolve exactly as they do without synonyms
+        m = OMOPConceptSource._index_rows(spec, concept_rows())
+        # synonyms are applied last so they take precedence, as before
+        norm = spec.normalizer
+        for cid, text in synonyms:
+            m[_intern_key(norm(text))] = cid
 
-        ids = {r.concept_id for r in rows}
+        return LookupIndex(name=spec.name, unknown=spec.unknown, mapping=MappingProxyType(m))
+
+    @staticmethod
+    def build_lookups_fused(
+        session: so.Session,
+        specs: Iterable[LookupSpec],
+    ) -> dict[str, LookupIndex]:
+        """
+        Build several lookups from a single ``UNION ALL`` query.
+
+        Each spec's concept filter becomes one branch of the union, tagged with
+        the spec name, so the concept table is visited in one round trip and
+        the results are partitioned in Python. Only flat specs can be fused;
+        specs with ``parents`` or ``include_synonyms`` are built individually
+        via ``build_lookup``.
+
+        Returns a mapping of spec name to LookupIndex. Caching follows
+        ``build_lookup``.
+        """
+        specs = list(specs)
+        # decided once, up front: the fused query itself opens a transaction.
+        # A throwaway cache keeps a session that may see uncommitted writes
+        # away from the shared one
+        cached = (
+            {} if _may_see_uncommitted(session) else OMOPConceptSource._engine_cache(session)
+        )
+        indexes: dict[str, LookupIndex] = {
+            spec.name: cached[spec] for spec in specs if spec in cached
+        }
+        fusable = [
+            s for s in specs
+            if not s.parents and not s.include_synonyms and s.name not in indexes
+        ]
+
+        if len(fusable) > 1:
+            dialect = session.get_bind().dialect.name
+            branches = [
+                OMOPConceptSource.select_concepts(
+                    domain_id=spec.domain_id,
+                    concept_class_id=spec.concept_class_id,
+                    vocabulary_id=spec.vocabulary_id,
+                    standard_only=spec.standard_only,
+                    code_filter=spec.code_filter,
+                    code_filter_mode=spec.code_filter_mode,
+                    dialect=dialect,
+                ).with_only_columns(*NAME_CODE_COLUMNS, sa.literal(spec.name).label("_spec"))
+                for spec in fusable
+            ]
+            # rows are folded straight into their spec's mapping as they
+            # stream in, rather than partitioned into per-spec lists first
+            targets: dict[str, tuple[Normaliser, bool, bool, dict[str, int]]] = {
+                spec.name: (
+                    spec.normalizer,
+                    "concept_name" in spec.include,
+                    "concept_code" in spec.include,
+                    {},
+                )
+                for spec in fusable
+            }
+            intern = _intern_key
+            result = session.execute(
+                sa.union_all(*branches).execution_options(yield_per=10_000)
+            )
+            for cid, name, code, tag in result:
+                norm, inc_name, inc_code, m = targets[tag]
+                if inc_name and name:
+                    m[intern(norm(name))] = cid
+                if inc_code and code:
+                    m[intern(norm(code))] = cid
+            for spec in fusable:
+                indexes[spec.name] = cached[spec] = LookupIndex(
+                    name=spec.name,
+                    unknown=spec.unknown,
+                    mapping=MappingProxyType(targets[spec.name][3]),
+                )
+
+        for spec in specs:
+            if spec.name not in indexes:
+                indexes[spec.name] = cached[spec] = OMOPConceptSource._build_lookup(session, spec)
+        return indexes
+
+    @staticmethod
+    def _index_rows(
+        spec: LookupSpec,
+        rows: Iterable[tuple[int, str, str]],
+    ) -> dict[str, int]:
+        """
+        Map the normalised ``spec.include`` fields of ``rows`` - as yielded by
+        ``iter_name_code`` - to concept IDs.
+
+        ``rows`` is consumed once, so it may be a stream.
+        """
+        # hoisted out of the row loop - this runs once per concept in scope
+        norm = spec.normalizer
+        inc_name = "concept_name" in spec.include
+        inc_code = "concept_code" in spec.include
+        intern = _intern_key
 
         m: dict[str, int] = {}
-        for r in rows:
-            if "concept_name" in spec.include and r.concept_name:
-                m[spec.normalizer(r.concept_name)] = r.concept_id
-            if "concept_code" in spec.include and r.concept_code:
-                m[spec.normalizer(r.concept_code)] = r.concept_id
-
-        if spec.include_synonyms:
-            for cid, syn in OMOPConceptSource.fetch_synonyms(session):
-                if cid in ids and syn:
-                    m[spec.normalizer(syn)] = cid
-
-        return LookupIndex(name=spec.name, unknown=spec.unknown, mapping=m)
+        if inc_name and inc_code:
+            for cid, name, code in rows:
+                if name:
+                    m[intern(norm(name))] = cid
+                if code:
+                    m[intern(norm(code))] = cid
+        elif inc_name:
+            m = {intern(norm(name)): cid for cid, name, _ in rows if name}
+        elif inc_code:
+            m = {intern(norm(code)): cid for cid, _, code in rows if code}
+        return m
     
 
 class ConceptResolver:
@@ -319,6 +1037,11 @@ class ConceptResolver:
         Optional ordered list of correction functions applied to the raw input
         term prior to normalisation and lookup. Each correction is tried in
         sequence until a match is found.
+    cache_size:
+        Maximum number of distinct raw input terms whose resolution is
+        memoised (LRU). Source columns such as gender or unit repeat the same
+        handful of values, so most lookups become a single cache hit. Set to
+        None for an unbounded cache or 0 to disable caching.
 
     Notes
     -----
@@ -345,24 +1068,46 @@ class ConceptResolver:
         index: LookupIndex,
         *,
         normalizer: Normaliser | None = None,
-        corrections: list[Callable[[str], str]] | None = None,
+        corrections: Iterable[Callable[[str], str]] | None = None,
+        cache_size: int | None = 4096,
     ):
         self.index = index
         self._normalizer = normalizer or normalize_default
-        self._corrections = corrections or []
+        self._corrections: tuple[Callable[[str], str], ...] = tuple(corrections or ())
+        self._cache_size = cache_size
+        self._cached_lookup = functools.lru_cache(maxsize=cache_size)(self._lookup_impl)
+
+    def __getstate__(self) -> dict[str, Any]:
+        # the lru_cache wrapper around a bound method cannot be pickled (e.g.
+        # for multiprocessing workers); it is rebuilt, empty, on unpickling
+        state = self.__dict__.copy()
+        del state["_cached_lookup"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._cached_lookup = functools.lru_cache(maxsize=self._cache_size)(self._lookup_impl)
 
     def lookup(self, term: str | None) -> int | None:
         if not term:
             return self.index.unknown
+        return self._cached_lookup(term)
+
+    def clear_cache(self) -> None:
+        """Drop all memoised lookup results."""
+        self._cached_lookup.cache_clear()
+
+    def _lookup_impl(self, term: str) -> int | None:
+        # bound locally - this is called once per source value in ETL
+        norm = self._normalizer
+        get = self.index.mapping.get
 
-        key = self._normalizer(term)
-        hit = self.index.mapping.get(key)
+        hit = get(norm(term))
         if hit is not None:
             return hit
 
         for corr in self._corrections:
-            key2 = self._normalizer(corr(term))
-            hit = self.index.mapping.get(key2)
+            hit = get(norm(corr(term)))
             if hit is not None:
                 return hit
 
@@ -374,15 +1119,13 @@ class ConceptResolver:
         return self.index.mapping.get(self._normalizer(term), self.index.unknown)
 
     def __contains__(self, item: str | int) -> bool:
-        if isinstance(item, int):
-            return item in self.index.mapping.values()
         if isinstance(item, str):
             return self.lookup(item) != self.index.unknown
-        return False
+        return self.index.has_concept(item)  # type: ignore[arg-type]
 
     @property
-    def all_concepts(self) -> set[int]:
-        return set(self.index.mapping.values())
+    def all_concepts(self) -> frozenset[int]:
+        return self.index.all_concepts
     
 
     def __repr__(self) -> str:
@@ -403,6 +1146,7 @@ def make_concept_resolver(
     vocabulary_id: list[str] | None = None,
     standard_only: bool = True,
     code_filter: str | None = None,
+    code_filter_mode: CodeFilterMode = "ilike",
     parents: list[int] | None = None,
     include_non_standard_descendants: bool = False,
     include_synonyms: bool = False,
@@ -410,6 +1154,7 @@ def make_concept_resolver(
     build_normalizer: Normaliser = normalize_default,
     runtime_normalizer: Normaliser | None = None,
     corrections: list[Callable[[str], str]] | None = None,
+    cache_size: int | None = 4096,
 ) -> ConceptResolver:
     """
     Convenience factory for constructing a ConceptResolver from declarative inputs.
@@ -439,6 +1184,9 @@ def make_concept_resolver(
     code_filter:
         Optional substring filter applied to concept_code (ILIKE-based). 
         Useful for coarse scoping (e.g. AJCC-only codes).
+    code_filter_mode:
+        Matching strategy for ``code_filter`` on PostgreSQL ("ilike", "trgm" or 
+        "fts"); see LookupSpec. Ignored on other dialects.
     parents:
         Optional list of ancestor concept IDs from which to expand the lookup 
         via the Concept_Ancestor table.
@@ -461,6 +1209,9 @@ def make_concept_resolver(
     corrections:
         Optional ordered list of correction functions applied to the raw input term prior 
         to normalisation and lookup
+    cache_size:
+        Maximum number of raw input terms memoised by the resolver (LRU). None for
+        unbounded, 0 to disable.
     """
 
     spec = LookupSpec(
@@ -471,6 +1222,7 @@ def make_concept_resolver(
         vocabulary_id=vocabulary_id,
         standard_only=standard_only,
         code_filter=code_filter,
+        code_filter_mode=code_filter_mode,
         parents=parents,
         include_non_standard_descendants=include_non_standard_descendants,
         include_synonyms=include_synonyms,
@@ -484,4 +1236,5 @@ def make_concept_resolver(
         index,
         normalizer=runtime_normalizer or build_normalizer,
         corrections=corrections,
+        cache_size=cache_size,
     )
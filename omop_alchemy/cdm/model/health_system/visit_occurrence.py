@@ -4,7 +4,6 @@ from typing import Optional, TYPE_CHECKING
 from datetime import date
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.ext.hybrid import hybrid_method
-from sqlalchemy.orm.exc import DetachedInstanceError
 
 from orm_loader.helpers import Base
 from omop_alchemy.cdm.base import (
@@ -94,24 +93,49 @@ class VisitView(Visit_Occurrence, VisitContext, DomainValidationMixin):
     }
 
     @property
-    def all_providers(self) -> set["Provider"]:
-        providers = set()
-        providers.update(getattr(self, "procedure_providers", []) or [])
-        providers.update(getattr(self, "observation_providers", []) or [])
-        if self.provider is not None:
-            providers.add(self.provider)
+    def all_providers(self) -> frozenset["Provider"]:
+        procedure = getattr(self, "procedure_providers", None) or ()
+        observation = getattr(self, "observation_providers", None) or ()
+        provider = self.provider
+        # memoised against the loaded collections themselves, so the set is
+        # rebuilt when a relationship is (re)loaded, e.g. after expiry;
+        # in-place changes drop the memo via _drop_provider_caches below
+        cached = self.__dict__.get("_all_providers_cache")
+        if (
+            cached is not None
+            and cached[0] is procedure
+            and cached[1] is observation
+            and cached[2] is provider
+        ):
+            return cached[3]
+        providers = frozenset(
+            [*procedure, *observation, *([provider] if provider is not None else [])]
+        )
+        self.__dict__["_all_providers_cache"] = (procedure, observation, provider, providers)
         return providers
     
 
+    @property
+    def _provider_specialties(self) -> frozenset[Optional[int]]:
+        providers = self.all_providers
+        cached = self.__dict__.get("_provider_specialties_cache")
+        if cached is not None and cached[0] is providers:
+            return cached[1]
+        specialties = set()
+        for p in providers:
+            state = sa.inspect(p)
+            # a detached provider whose specialty was never loaded cannot be
+            # read without a session - skip it rather than attempt the load
+            if state.detached and "specialty_source_concept_id" in state.unloaded:
+                continue
+            specialties.add(p.specialty_source_concept_id)
+        result = frozenset(specialties)
+        self.__dict__["_provider_specialties_cache"] = (providers, result)
+        return result
+
     @hybrid_method
     def has_provider_specialty(self, specialty_concept_id: int) -> bool: 
-        for p in self.all_providers:
-            try:
-                if p.specialty_source_concept_id == specialty_concept_id:
-                    return True
-            except DetachedInstanceError:
-                pass
-        return False
+        return specialty_concept_id in self._provider_specialties
 
     @has_provider_specialty.expression
     @classmethod
@@ -125,4 +149,15 @@ class VisitView(Visit_Occurrence, VisitContext, DomainValidationMixin):
                 ),
                 Provider.specialty_source_concept_id == specialty_concept_id,
             )
-        )
\ No newline at end of file
+        )
+
+
+def _drop_provider_caches(target: VisitView, *args: object, **kwargs: object) -> None:
+    target.__dict__.pop("_all_providers_cache", None)
+    target.__dict__.pop("_provider_specialties_cache", None)
+
+
+for _collection in (VisitView.procedure_providers, VisitView.observation_providers):
+    sa.event.listen(_collection, "append", _drop_provider_caches, propagate=True)
+    sa.event.listen(_collection, "remove", _drop_provider_caches, propagate=True)
+sa.event.listen(VisitView.provider, "set", _drop_provider_caches, propagate=True)
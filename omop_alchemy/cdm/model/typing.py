@@ -1,3 +1,4 @@
+import sys
 from dataclasses import dataclass
 from typing import Protocol, Iterable, Optional, Union, Callable
 
@@ -7,7 +8,11 @@ This module contains type definitions for the OMOP CDM model.
 These types are used to provide type hints for row types for the base directly-mapped classes in the model.
 """
 
-@dataclass(frozen=True)
+def _intern(value: str) -> str:
+    return sys.intern(value) if type(value) is str else value
+
+
+@dataclass(frozen=True, slots=True)
 class ConceptRow:
     concept_id: int
     concept_name: str
@@ -16,3 +21,18 @@ class ConceptRow:
     concept_class_id: str | None
     vocabulary_id: str | None
     standard_concept: str | None
+
+    def __post_init__(self) -> None:
+        # the categorical ids take a handful of distinct values across the
+        # whole vocabulary, so each row shares one string object per value.
+        # concept_name / concept_code are (near) unique per concept, so
+        # interning them would save nothing - and on CPython 3.12 interned
+        # strings are never freed, so they would outlive the rows
+        # (standard_concept is a single character, which CPython already shares)
+        setattr_ = object.__setattr__
+        if self.domain_id:
+            setattr_(self, "domain_id", _intern(self.domain_id))
+        if self.concept_class_id:
+            setattr_(self, "concept_class_id", _intern(self.concept_class_id))
+        if self.vocabulary_id:
+            setattr_(self, "vocabulary_id", _intern(self.vocabulary_id))
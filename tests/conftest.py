@@ -4,6 +4,7 @@ from sqlalchemy.orm import sessionmaker, Session
 from pathlib import Path
 from omop_alchemy import get_engine_name, load_environment
 from orm_loader.helpers import bootstrap
+from omop_alchemy.cdm.handlers.vocabs_and_mappers.vocab_handlers import OMOPConceptSource
 
 
 @pytest.fixture(scope="session")
@@ -21,28 +22,64 @@ def engine():
         echo=False,
     )
 
+    # pysqlite defers BEGIN and mishandles SAVEPOINT; let SQLAlchemy emit
+    # BEGIN itself so the per-test savepoints below behave
+    @sa.event.listens_for(engine, "connect")
+    def _disable_pysqlite_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @sa.event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
     bootstrap(engine, create=False)
     
     return engine
 
 
-@pytest.fixture(scope="function")
-def session(engine) -> Session: # type: ignore
+@pytest.fixture(scope="session")
+def connection(engine):
     """
-    Function-scoped SQLAlchemy session.
+    Session-scoped connection shared by every test's session.
 
-    Each test gets a clean transactional boundary.
+    Checked out of the pool once per test run.
+    """
+    with engine.connect() as conn:
+        yield conn
+
+
+@pytest.fixture(scope="session")
+def session_factory(connection):
     """
-    SessionLocal = sessionmaker(
-        bind=engine,
+    Session-scoped sessionmaker bound to the shared connection.
+
+    Sessions join the test's outer transaction via a SAVEPOINT, so a
+    ``commit()`` inside a test only releases the savepoint.
+    """
+    return sessionmaker(
+        bind=connection,
         future=True,
         expire_on_commit=False,
+        join_transaction_mode="create_savepoint",
     )
 
-    session = SessionLocal()
+
+@pytest.fixture(scope="function")
+def session(connection, session_factory) -> Session: # type: ignore
+    """
+    Function-scoped SQLAlchemy session.
+
+    Each test runs inside an outer transaction on the shared connection
+    that is rolled back afterwards, so every test gets a clean transactional
+    boundary without a fresh connection checkout.
+    """
+    transaction = connection.begin()
+    session = session_factory()
 
     try:
         yield session       # type: ignore
-        session.rollback()  # safety: undo mutations
     finally:
         session.close()
+        transaction.rollback()  # undo mutations, committed or not
+        # lookups memoised on this engine may have seen the rolled-back rows
+        OMOPConceptSource.clear_lookup_cache(connection)
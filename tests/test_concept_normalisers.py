@@ -0,0 +1,115 @@
+import functools
+import re
+
+import pytest
+
+from omop_alchemy.cdm.handlers.vocabs_and_mappers import (
+    compose_normalizers,
+    make_stage,
+    normalize_default,
+    replacement_normalizer,
+    site_to_NOS,
+    specialize_normalizer,
+    strip_uicc,
+)
+from omop_alchemy.cdm.handlers.vocabs_and_mappers.concept_registry import _callable_key
+
+
+def test_unnamed_parts_leave_pipelines_unnamed():
+    squash = functools.partial(re.sub, r"\s+", " ")
+    for build in (compose_normalizers, specialize_normalizer):
+        fn = build(squash, normalize_default)
+        assert fn("  Male \t Gender ") == "male gender"
+        assert _callable_key(fn) is None
+
+
+def _old_make_stage(val):
+    val = val.lower()
+    roman_lookup = [('-iii', '-3'), ('-iv', '-4'), ('-ii', '-2'), ('-i', '-1'), ('nos', '')]
+    for replacement in roman_lookup:
+        val = val.replace(*replacement)
+    return val
+
+
+def _old_site_to_NOS(icdo_topog):
+    split_topog = icdo_topog.split('.')
+    if '.' not in icdo_topog:
+        return f'{icdo_topog}.9'
+    elif len(split_topog[-1]) > 2:
+        return ''.join(split_topog[:-1] + ['.', split_topog[-1][:2]])
+    return icdo_topog
+
+
+STAGE_TERMS = ["Stage III", "stage-iii", "Stage-IV NOS", "AJCC-II", "-i-ii-iii", "nosnos", "", "T1-iva"]
+SITE_TERMS = ["C34", "C34.1", "C34.12", "C34.123", "C3.4.123", "C.", "", "c50.9"]
+
+
+@pytest.mark.parametrize("term", STAGE_TERMS)
+def test_make_stage_matches_replace_chain(term):
+    assert make_stage(term) == _old_make_stage(term)
+
+
+@pytest.mark.parametrize("term", SITE_TERMS)
+def test_site_to_NOS_matches_split_version(term):
+    assert site_to_NOS(term) == _old_site_to_NOS(term)
+
+
+def _old_chain(*fns):
+    def _inner(s):
+        for fn in fns:
+            s = fn(s)
+        return s
+    return _inner
+
+
+PIPELINES = [
+    (normalize_default,),
+    (strip_uicc, make_stage),
+    (normalize_default, strip_uicc, make_stage),
+    (normalize_default, site_to_NOS),
+    (site_to_NOS, normalize_default, make_stage, strip_uicc),
+    (str.upper, make_stage, str.title),
+]
+PIPELINE_TERMS = STAGE_TERMS + SITE_TERMS + ["  AJCC Stage-III NOS ", "ajcc-i.23"]
+
+
+@pytest.mark.parametrize("fns", PIPELINES)
+@pytest.mark.parametrize("term", PIPELINE_TERMS)
+def test_pipelines_match_old_chain(fns, term):
+    expected = _old_chain(*fns)(term)
+    assert compose_normalizers(*fns)(term) == expected
+    assert specialize_normalizer(*fns)(term) == expected
+
+
+def test_replacement_normalizer_merges_disjoint_tables():
+    first = replacement_normalizer({"foo": "x"})
+    second = replacement_normalizer({"bar": "y"})
+    merged = compose_normalizers(first, second)
+    assert merged.replacements == {"foo": "x", "bar": "y"}  # type: ignore[attr-defined]
+    assert merged("FOO BAR") == "x y"
+
+
+@pytest.mark.parametrize(
+    "tables",
+    [
+        ({"a": "b"}, {"b": "c"}),  # second matches what the first produced
+        ({"ab": "x"}, {"b": "y"}),  # second matches inside the first's keys
+        ({"a": "B"}, {"b": "c"}),  # first produces upper case
+    ],
+)
+def test_replacement_normalizer_keeps_unsafe_runs_sequential(tables):
+    fns = [replacement_normalizer(t) for t in tables]
+    for term in ["a", "ab", "AB", "bab", "xyz"]:
+        expected = _old_chain(*fns)(term)
+        assert compose_normalizers(*fns)(term) == expected
+        assert specialize_normalizer(*fns)(term) == expected
+
+
+def test_specialize_normalizer_is_cached_and_named():
+    fn = specialize_normalizer(normalize_default, make_stage)
+    assert specialize_normalizer(normalize_default, make_stage) is fn
+    assert _callable_key(fn) is not None
+    assert _callable_key(fn) == _callable_key(specialize_normalizer(normalize_default, make_stage))
+
+    with pytest.raises(ValueError):
+        specialize_normalizer()
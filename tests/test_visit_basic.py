@@ -0,0 +1,63 @@
+import sqlalchemy as sa
+
+from omop_alchemy.cdm.model.health_system import Provider
+from omop_alchemy.cdm.model.health_system.visit_occurrence import VisitView
+
+
+def _provider(provider_id, specialty=None):
+    return Provider(provider_id=provider_id, specialty_source_concept_id=specialty)
+
+
+def test_all_providers_collects_every_relationship():
+    visit = VisitView(visit_occurrence_id=1)
+    assert visit.all_providers == frozenset()
+
+    attending, surgeon, observer = _provider(1), _provider(2), _provider(3)
+    visit.provider = attending
+    visit.procedure_providers.append(surgeon)
+    visit.observation_providers.append(observer)
+    visit.observation_providers.append(surgeon)
+    assert visit.all_providers == {attending, surgeon, observer}
+    assert isinstance(visit.all_providers, frozenset)
+
+
+def test_all_providers_is_memoised():
+    visit = VisitView(visit_occurrence_id=1)
+    visit.procedure_providers.append(_provider(1))
+    assert visit.all_providers is visit.all_providers
+
+
+def test_all_providers_follows_collection_changes():
+    visit = VisitView(visit_occurrence_id=1)
+    first, second = _provider(1), _provider(2)
+    visit.procedure_providers.append(first)
+    assert visit.all_providers == {first}
+
+    # in place, so the collection keeps its identity
+    visit.procedure_providers.append(second)
+    assert visit.all_providers == {first, second}
+    visit.procedure_providers.remove(first)
+    assert visit.all_providers == {second}
+    visit.observation_providers.append(first)
+    assert visit.all_providers == {first, second}
+
+    replacement = _provider(3)
+    visit.provider = replacement
+    assert visit.all_providers == {first, second, replacement}
+
+
+def test_has_provider_specialty():
+    visit = VisitView(visit_occurrence_id=1)
+    visit.provider = _provider(1, specialty=38004446)
+    assert visit.has_provider_specialty(38004446)
+    assert not visit.has_provider_specialty(38004456)
+
+    visit.procedure_providers.append(_provider(2, specialty=38004456))
+    assert visit.has_provider_specialty(38004456)
+
+
+def test_has_provider_specialty_expression():
+    stmt = sa.select(VisitView.visit_occurrence_id).where(VisitView.has_provider_specialty(38004446))
+    sql = str(stmt.compile(compile_kwargs={"literal_binds": True}))
+    assert "EXISTS" in sql
+    assert "specialty_source_concept_id = 38004446" in sql
@@ -0,0 +1,557 @@
+import pickle
+import sys
+import types
+from datetime import date
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+from orm_loader.helpers import bootstrap
+
+from omop_alchemy.cdm.model import ConceptRow
+from omop_alchemy.cdm.model.vocabulary import Concept, Concept_Ancestor, Concept_Synonym
+from omop_alchemy.cdm.handlers.vocabs_and_mappers import concept_registry
+from omop_alchemy.cdm.handlers.vocabs_and_mappers import (
+    ConceptResolver,
+    ConceptResolverRegistry,
+    LookupIndex,
+    LookupSpec,
+    TrieMapping,
+    compose_normalizers,
+    make_concept_resolver,
+    make_stage,
+    strip_uicc,
+)
+from omop_alchemy.cdm.handlers.vocabs_and_mappers.vocab_handlers import (
+    ID_FILTER_VALUES_THRESHOLD,
+    OMOPConceptSource,
+    PARENTS_JOIN_THRESHOLD,
+)
+
+
+def _concept(concept_id, name, code, domain, vocabulary, standard="S"):
+    return Concept(
+        concept_id=concept_id,
+        concept_name=name,
+        concept_code=code,
+        domain_id=domain,
+        vocabulary_id=vocabulary,
+        concept_class_id=domain,
+        standard_concept=standard,
+        valid_start_date=date(2000, 1, 1),
+        valid_end_date=date(2099, 12, 31),
+    )
+
+
+def _ancestor(ancestor, descendant, level):
+    return Concept_Ancestor(
+        ancestor_concept_id=ancestor,
+        descendant_concept_id=descendant,
+        min_levels_of_separation=level,
+        max_levels_of_separation=level,
+    )
+
+
+def _seeded_engine(path):
+    """
+    File-backed SQLite vocabulary with a couple of small hierarchies.
+
+    A file (rather than :memory:) so registry builds on worker threads see
+    the same database.
+    """
+    engine = sa.create_engine(f"sqlite:///{path}", future=True)
+    bootstrap(engine, create=True)
+    with Session(engine) as session:
+        session.add_all([
+            _concept(8507, "MALE", "M", "Gender", "Gender"),
+            _concept(8532, "FEMALE", "F", "Gender", "Gender"),
+            _concept(8551, "UNKNOWN", "U", "Gender", "Gender", standard=None),
+            _concept(100, "Neoplasm", "C00-C97", "Condition", "ICD10"),
+            _concept(101, "Lung cancer", "C34", "Condition", "ICD10"),
+            _concept(102, "Lung cancer, upper lobe", "C34.1", "Condition", "ICD10"),
+            _concept(103, "Old lung cancer", "C34.9", "Condition", "ICD10", standard=None),
+            _concept(200, "Diabetes", "E11", "Condition", "ICD10"),
+            _concept(201, "Type 2 diabetes", "E11.9", "Condition", "ICD10"),
+            _concept(300, "AJCC/UICC Stage 3", "AJCC/UICC-III", "Measurement", "Cancer Modifier"),
+            _concept(301, "AJCC/UICC Stage 1", "AJCC/UICC-I", "Measurement", "Cancer Modifier"),
+            _concept(302, "Clinical stage", "cStage", "Measurement", "Cancer Modifier"),
+        ])
+        session.flush()
+        session.add_all([
+            _ancestor(100, 100, 0),
+            _ancestor(100, 101, 1),
+            _ancestor(100, 102, 2),
+            _ancestor(100, 103, 1),
+            _ancestor(101, 102, 1),
+            _ancestor(200, 200, 0),
+            _ancestor(200, 201, 1),
+            Concept_Synonym(concept_id=8507, concept_synonym_name="Man", language_concept_id=4180186),
+            Concept_Synonym(concept_id=101, concept_synonym_name="Lung carcinoma", language_concept_id=4180186),
+        ])
+        session.commit()
+    return engine
+
+
+@pytest.fixture(scope="module")
+def vocab_engine(tmp_path_factory):
+    engine = _seeded_engine(tmp_path_factory.mktemp("vocab") / "vocab.db")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def vocab_session(vocab_engine):
+    with Session(vocab_engine) as session:
+        yield session
+
+
+@pytest.fixture(autouse=True)
+def _clear_lookup_memo():
+    yield
+    OMOPConceptSource.clear_lookup_cache()
+
+
+SPECS = [
+    LookupSpec(name="gender", domain_id="Gender"),
+    LookupSpec(name="gender_all", domain_id="Gender", standard_only=False),
+    LookupSpec(name="condition_codes", domain_id="Condition", include=("concept_code",)),
+    LookupSpec(
+        name="stage",
+        vocabulary_id=["Cancer Modifier"],
+        code_filter="ajcc",
+        normalizer=compose_normalizers(strip_uicc, make_stage),
+    ),
+    LookupSpec(name="gender_syn", domain_id="Gender", include_synonyms=True),
+    LookupSpec(name="lung", parents=[101]),
+]
+
+
+# ---- lookup builds --------------------------------------------------------
+
+def test_fused_build_matches_per_spec_build(vocab_session):
+    fused = OMOPConceptSource.build_lookups_fused(vocab_session, SPECS)
+    OMOPConceptSource.clear_lookup_cache()
+
+    for spec in SPECS:
+        single = OMOPConceptSource.build_lookup(vocab_session, spec)
+        assert dict(fused[spec.name].mapping) == dict(single.mapping), spec.name
+        assert fused[spec.name].unknown == single.unknown
+
+
+def test_prebuild_fused_matches_get(vocab_engine):
+    fused = ConceptResolverRegistry(vocab_engine)
+    fused.prebuild_fused(SPECS)
+    OMOPConceptSource.clear_lookup_cache()
+
+    single = ConceptResolverRegistry(vocab_engine)
+    for spec in SPECS:
+        single.register_spec(spec)
+
+    for spec in SPECS:
+        assert spec.name in fused
+        assert dict(fused[spec.name].index.mapping) == dict(single[spec.name].index.mapping)
+
+
+
+# ids with no concept or ancestry rows, to push parent lists past the
+# semi-join threshold without changing the result
+_PADDING = list(range(10_000, 10_000 + PARENTS_JOIN_THRESHOLD + 50))
+
+
+@pytest.mark.parametrize("include_synonyms", [False, True])
+def test_large_parent_lists_match_small_ones(vocab_session, include_synonyms):
+    small = LookupSpec(name="small", parents=[100], include_synonyms=include_synonyms)
+    large = LookupSpec(name="large", parents=[100, *_PADDING], include_synonyms=include_synonyms)
+
+    expected = dict(OMOPConceptSource.build_lookup(vocab_session, small).mapping)
+    assert dict(OMOPConceptSource.build_lookup(vocab_session, large).mapping) == expected
+    assert set(expected.values()) == {100, 101, 102}
+
+
+def test_large_parent_lists_in_fetch_concepts_and_descendants(vocab_session):
+    rows = OMOPConceptSource.fetch_concepts(vocab_session, parents=[100, *_PADDING])
+    assert sorted(r.concept_id for r in rows) == [100, 101, 102]
+    assert sorted(
+        OMOPConceptSource.descendants(vocab_session, [200, *_PADDING], include_non_standard=True)
+    ) == [200, 201]
+
+
+
+
+
+def test_descendants_without_parents_returns_every_concept(vocab_session):
+    standard = set(vocab_session.scalars(
+        sa.select(Concept.concept_id).where(Concept.standard_concept == "S")
+    ))
+    every = set(vocab_session.scalars(sa.select(Concept.concept_id)))
+    assert standard < every
+    assert set(OMOPConceptSource.descendants(vocab_session, [])) == standard
+    assert set(OMOPConceptSource.descendants(vocab_session, [], include_non_standard=True)) == every
+
+
+def test_build_lookup_contents(vocab_session):
+    gender = OMOPConceptSource.build_lookup(vocab_session, SPECS[0])
+    assert dict(gender.mapping) == {"male": 8507, "m": 8507, "female": 8532, "f": 8532}
+
+    synonyms = OMOPConceptSource.build_lookup(vocab_session, SPECS[4])
+    assert synonyms.lookup("man") == 8507
+
+    lung = OMOPConceptSource.build_lookup(vocab_session, SPECS[5])
+    assert lung.all_concepts == {102}
+
+
+@pytest.mark.parametrize("mode", ["ilike", "trgm", "fts"])
+def test_code_filter_mode_falls_back_to_substring_off_postgres(vocab_session, mode):
+    spec = LookupSpec(
+        name=f"stage_{mode}",
+        vocabulary_id=["Cancer Modifier"],
+        code_filter="AJCC",
+        code_filter_mode=mode,
+    )
+    index = OMOPConceptSource.build_lookup(vocab_session, spec)
+    assert index.all_concepts == {300, 301}
+
+
+def test_unknown_code_filter_mode_raises(vocab_session):
+    spec = LookupSpec(name="bad", code_filter="x", code_filter_mode="regex")  # type: ignore[arg-type]
+    with pytest.raises(ValueError):
+        OMOPConceptSource.build_lookup(vocab_session, spec)
+
+
+def test_synonym_build_resolves_collisions_like_plain_build(tmp_path):
+    engine = _seeded_engine(tmp_path / "collide.db")
+    with Session(engine) as session:
+        # a name of one concept that is the code of another
+        session.add_all([
+            _concept(400, "Alpha", "beta", "Observation", "Local"),
+            _concept(401, "Beta", "gamma", "Observation", "Local"),
+        ])
+        session.commit()
+        plain = OMOPConceptSource.build_lookup(session, LookupSpec(name="p", domain_id="Observation"))
+        with_syn = OMOPConceptSource.build_lookup(
+            session, LookupSpec(name="s", domain_id="Observation", include_synonyms=True)
+        )
+    engine.dispose()
+    assert dict(plain.mapping) == dict(with_syn.mapping)
+
+
+def test_descendants_many(vocab_session):
+    result = OMOPConceptSource.descendants_many(
+        vocab_session, {"neoplasm": [100], "diabetes": [200], "lung": [101], "none": []}
+    )
+    assert sorted(result["neoplasm"]) == [100, 101, 102]
+    assert sorted(result["diabetes"]) == [200, 201]
+    assert result["lung"] == [102]
+    assert result["none"] == []
+
+    wide = OMOPConceptSource.descendants_many(
+        vocab_session, {"neoplasm": [100]}, include_non_standard=True
+    )
+    assert sorted(wide["neoplasm"]) == [100, 101, 102, 103]
+    assert sorted(OMOPConceptSource.descendants(vocab_session, [100, 200])) == [100, 101, 102, 200, 201]
+
+
+# ---- lookup memo ----------------------------------------------------------
+
+def test_lookup_spec_stores_sequences_as_tuples():
+    spec = LookupSpec(name="x", vocabulary_id=["ICD10"], parents=[100, 200])
+    assert spec.vocabulary_id == ("ICD10",)
+    assert spec.parents == (100, 200)
+    assert spec == LookupSpec(name="x", vocabulary_id=("ICD10",), parents=(100, 200))
+    assert hash(spec) == hash(LookupSpec(name="x", vocabulary_id=("ICD10",), parents=(100, 200)))
+
+
+def test_build_lookup_memoised_across_fresh_sessions(vocab_engine):
+    spec = LookupSpec(name="gender", domain_id="Gender")
+    with Session(vocab_engine) as session:
+        first = OMOPConceptSource.build_lookup(session, spec)
+    with Session(vocab_engine) as session:
+        assert OMOPConceptSource.build_lookup(session, spec) is first
+    with Session(vocab_engine) as session:
+        rebuilt = OMOPConceptSource.build_lookup(session, spec, force=True)
+        assert rebuilt is not first
+        assert dict(rebuilt.mapping) == dict(first.mapping)
+    with Session(vocab_engine) as session:
+        assert OMOPConceptSource.build_lookup(session, spec) is rebuilt
+
+    OMOPConceptSource.clear_lookup_cache(vocab_engine)
+    with Session(vocab_engine) as session:
+        assert OMOPConceptSource.build_lookup(session, spec) is not rebuilt
+
+
+def test_built_mapping_is_read_only(vocab_session):
+    index = OMOPConceptSource.build_lookup(vocab_session, SPECS[0])
+    with pytest.raises(TypeError):
+        index.mapping["x"] = 1  # type: ignore[index]
+
+
+def test_lookup_index_pickles(vocab_session):
+    index = OMOPConceptSource.build_lookup(vocab_session, SPECS[0])
+    restored = pickle.loads(pickle.dumps(index))
+    assert dict(restored.mapping) == dict(index.mapping)
+    assert restored.all_concepts == index.all_concepts
+
+
+def _phantom_is_memoised(engine, spec):
+    with Session(engine) as session:
+        return OMOPConceptSource.build_lookup(session, spec).lookup("phantom") != 0
+
+
+def test_flushed_writes_bypass_lookup_memo(vocab_engine):
+    spec = LookupSpec(name="gender", domain_id="Gender")
+    with Session(vocab_engine) as session:
+        session.add(_concept(999999, "PHANTOM", "P", "Gender", "Gender"))
+        session.flush()
+        assert OMOPConceptSource.build_lookup(session, spec).lookup("phantom") == 999999
+        session.rollback()
+    assert not _phantom_is_memoised(vocab_engine, spec)
+
+
+def test_connection_level_writes_bypass_lookup_memo(vocab_engine):
+    spec = LookupSpec(name="gender", domain_id="Gender")
+    with Session(vocab_engine) as session:
+        session.connection().execute(
+            sa.insert(Concept.__table__).values(
+                concept_id=999999, concept_name="PHANTOM", concept_code="P",
+                domain_id="Gender", vocabulary_id="Gender", concept_class_id="Gender",
+                standard_concept="S", valid_start_date=date(2000, 1, 1),
+                valid_end_date=date(2099, 12, 31),
+            )
+        )
+        assert OMOPConceptSource.build_lookup(session, spec).lookup("phantom") == 999999
+        session.rollback()
+    assert not _phantom_is_memoised(vocab_engine, spec)
+
+
+def test_outer_transaction_writes_bypass_lookup_memo(vocab_engine):
+    # the conftest pattern: sessions join an outer transaction through a
+    # savepoint, so their commit() leaves the writes uncommitted
+    engine = sa.create_engine(vocab_engine.url, future=True)
+
+    @sa.event.listens_for(engine, "connect")
+    def _disable_pysqlite_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @sa.event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    spec = LookupSpec(name="gender", domain_id="Gender")
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        session = Session(bind=connection, join_transaction_mode="create_savepoint")
+        session.add(_concept(999999, "PHANTOM", "P", "Gender", "Gender"))
+        session.commit()  # only releases the savepoint
+
+        with Session(bind=connection, join_transaction_mode="create_savepoint") as fresh:
+            assert OMOPConceptSource.build_lookup(fresh, spec).lookup("phantom") == 999999
+        session.close()
+        transaction.rollback()
+    assert not _phantom_is_memoised(engine, spec)
+    engine.dispose()
+
+
+# ---- synonyms -------------------------------------------------------------
+
+def test_fetch_synonyms(vocab_session):
+    assert sorted(OMOPConceptSource.fetch_synonyms(vocab_session)) == [
+        (101, "Lung carcinoma"),
+        (8507, "Man"),
+    ]
+    assert OMOPConceptSource.fetch_synonyms(vocab_session, [8507, 8532]) == [(8507, "Man")]
+    assert OMOPConceptSource.fetch_synonyms(vocab_session, []) == []
+
+
+def test_fetch_synonyms_for_large_id_sets(vocab_session):
+    ids = [101, 8507, *range(20_000, 20_000 + ID_FILTER_VALUES_THRESHOLD + 10)]
+    assert sorted(OMOPConceptSource.iter_synonyms(vocab_session, iter(ids))) == [
+        (101, "Lung carcinoma"),
+        (8507, "Man"),
+    ]
+
+
+# ---- indexes --------------------------------------------------------------
+
+def test_build_compact_matches_dict_index():
+    pytest.importorskip("marisa_trie")
+    pairs = [("male", 8507), ("m", 8507), ("female", 8532), ("local", -5), ("male", 1)]
+    compact = LookupIndex.build_compact("g", 0, pairs)
+    plain = LookupIndex(name="g", unknown=0, mapping=dict(pairs))
+
+    assert isinstance(compact.mapping, TrieMapping)
+    # duplicate keys keep the last value, as in a dict
+    assert dict(compact.mapping) == dict(plain.mapping)
+    assert len(compact.mapping) == len(plain.mapping)
+    for term in ("male", "m", "female", "local", "missing", ""):
+        assert compact.lookup(term) == plain.lookup(term)
+    assert compact.all_concepts == plain.all_concepts
+    assert dict(pickle.loads(pickle.dumps(compact)).mapping) == dict(plain.mapping)
+
+
+def test_lookup_index_contains_str_subclass():
+    class Code(str):
+        pass
+
+    index = LookupIndex(name="x", unknown=0, mapping={"m": 8507})
+    assert Code("m") in index
+    assert 8507 in index
+    assert "f" not in index
+
+
+# ---- disk cache -----------------------------------------------------------
+
+def test_disk_cache_round_trip(vocab_engine, tmp_path, monkeypatch):
+    spec = SPECS[3]
+    first = ConceptResolverRegistry(vocab_engine, cache_dir=tmp_path)
+    first.register_spec(spec)
+    built = first.get(spec.name).index
+    assert len(list(tmp_path.glob("*.pkl"))) == 1
+
+    def _no_build(*args, **kwargs):
+        raise AssertionError("index should have been loaded from disk")
+
+    monkeypatch.setattr(OMOPConceptSource, "build_lookup", _no_build)
+    second = ConceptResolverRegistry(vocab_engine, cache_dir=tmp_path)
+    second.register_spec(spec)
+    loaded = second.get(spec.name).index
+    assert dict(loaded.mapping) == dict(built.mapping)
+    assert loaded.unknown == built.unknown
+    with pytest.raises(TypeError):
+        loaded.mapping["x"] = 1  # type: ignore[index]
+
+
+def test_disk_cache_invalidated_by_package_version(vocab_engine, tmp_path, monkeypatch):
+    spec = SPECS[0]
+    first = ConceptResolverRegistry(vocab_engine, cache_dir=tmp_path)
+    first.register_spec(spec)
+    first.get(spec.name)
+
+    monkeypatch.setattr(concept_registry, "_package_version", lambda: "0.0.0-other")
+    second = ConceptResolverRegistry(vocab_engine, cache_dir=tmp_path)
+    second.register_spec(spec)
+    second.get(spec.name)
+    assert len(list(tmp_path.glob("*.pkl"))) == 2
+
+
+def test_disk_cache_invalidated_by_concept_changes(tmp_path):
+    engine = _seeded_engine(tmp_path / "vocab.db")
+    cache_dir = tmp_path / "cache"
+    spec = LookupSpec(name="gender", domain_id="Gender")
+
+    first = ConceptResolverRegistry(engine, cache_dir=cache_dir)
+    first.register_spec(spec)
+    assert first.get("gender").lookup("other") == 0
+
+    with Session(engine) as session:
+        session.add(_concept(8521, "OTHER", "O", "Gender", "Gender"))
+        session.commit()
+    OMOPConceptSource.clear_lookup_cache(engine)
+
+    second = ConceptResolverRegistry(engine, cache_dir=cache_dir)
+    second.register_spec(spec)
+    assert second.get("gender").lookup("other") == 8521
+    engine.dispose()
+
+
+def test_disk_cache_skips_unnamed_normalisers(vocab_engine, tmp_path):
+    registry = ConceptResolverRegistry(vocab_engine, cache_dir=tmp_path)
+    registry.register_spec(
+        LookupSpec(name="gender", domain_id="Gender", normalizer=lambda s: s.lower())
+    )
+    assert registry.get("gender").lookup("male") == 8507
+    assert list(tmp_path.glob("*.pkl")) == []
+
+
+
+def test_disk_cache_rebuilds_from_stale_pickles(vocab_engine, tmp_path, monkeypatch):
+    spec = SPECS[0]
+    first = ConceptResolverRegistry(vocab_engine, cache_dir=tmp_path)
+    first.register_spec(spec)
+    first.get(spec.name)
+    (path,) = tmp_path.glob("*.pkl")
+
+    # a payload naming a class from a module that no longer exists
+    stale = types.ModuleType("_omop_alchemy_stale")
+    exec("class Gone:\n    pass", stale.__dict__)
+    stale.Gone.__module__ = stale.__name__
+    monkeypatch.setitem(sys.modules, stale.__name__, stale)
+    with path.open("rb") as f:
+        payload = pickle.load(f)
+    path.write_bytes(pickle.dumps(payload[:4] + (stale.Gone(),)))
+    monkeypatch.delitem(sys.modules, stale.__name__)
+
+    second = ConceptResolverRegistry(vocab_engine, cache_dir=tmp_path)
+    second.register_spec(spec)
+    assert second.get(spec.name).lookup("male") == 8507
+
+
+# ---- resolvers ------------------------------------------------------------
+
+def test_resolver_memoises_and_clears(vocab_session):
+    resolver = make_concept_resolver(vocab_session, name="gender", domain_id="Gender", cache_size=2)
+    assert resolver.lookup(" Male ") == 8507
+    assert resolver.lookup(" Male ") == 8507
+    info = resolver._cached_lookup.cache_info()
+    assert (info.hits, info.maxsize) == (1, 2)
+
+    resolver.clear_cache()
+    assert resolver._cached_lookup.cache_info().currsize == 0
+    assert resolver.lookup("female") == 8532
+
+
+def test_resolver_cache_disabled(vocab_session):
+    resolver = make_concept_resolver(vocab_session, name="gender", domain_id="Gender", cache_size=0)
+    assert resolver.lookup("m") == 8507
+    assert resolver._cached_lookup.cache_info().currsize == 0
+
+
+def test_resolver_pickles_with_cache_size(vocab_session):
+    resolver = make_concept_resolver(vocab_session, name="gender", domain_id="Gender", cache_size=7)
+    resolver.lookup("male")
+
+    restored = pickle.loads(pickle.dumps(resolver))
+    assert isinstance(restored, ConceptResolver)
+    assert restored.lookup("MALE") == 8507
+    assert restored._cached_lookup.cache_info().maxsize == 7
+
+
+# ---- registry -------------------------------------------------------------
+
+def test_prebuild_builds_registered_resolvers(vocab_engine):
+    registry = ConceptResolverRegistry(vocab_engine)
+    for spec in SPECS:
+        registry.register_spec(spec)
+
+    registry.prebuild(max_workers=3)
+    assert registry.get("gender").lookup("f") == 8532
+    assert registry.get("stage").lookup("ajcc/uicc-3") == 300
+
+    with pytest.raises(KeyError):
+        registry.prebuild(["missing"])
+
+
+def test_ensure_indexes_sqlite(vocab_engine):
+    registry = ConceptResolverRegistry(vocab_engine)
+    registry.ensure_indexes()
+    registry.ensure_indexes()  # idempotent
+
+    names = {ix["name"] for ix in sa.inspect(vocab_engine).get_indexes("concept")}
+    assert {"ix_concept_domain_std", "ix_concept_code"} <= names
+
+
+def test_ensure_indexes_unsupported_dialect():
+    engine = sa.create_mock_engine("mysql://", lambda *args, **kwargs: None)
+    with pytest.raises(NotImplementedError):
+        ConceptResolverRegistry(engine).ensure_indexes()  # type: ignore[arg-type]
+
+
+# ---- concept rows ---------------------------------------------------------
+
+def test_concept_row_interns_only_categorical_fields():
+    # built at runtime so neither string starts out interned
+    domain = "".join(["Cond", "ition"])
+    name = "".join(["Lung ", "cancer"])
+    row = ConceptRow(101, name, "C34", domain, "Condition", "ICD10", "S")
+
+    assert row.domain_id is sys.intern("Condition")
+    assert row.concept_name is name